@@ -22,6 +22,7 @@ PAGES = {
     "Batch Symbol Scanner": "definedge_batch_scan",
     "Candlestick Demo": "simple_chart_demo",
     "Websocket Help": "websocket_help",
+    "Request Trace": "request_trace",
 }
 
 st.title("Gopal Mandloi Integrate Dashboard")
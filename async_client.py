@@ -0,0 +1,75 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from transport import http_get, http_post
+from utils import INTEGRATE_BASE_URL, get_session_headers, handle_integrate_response
+import tracing
+import response_cache
+
+# Async counterparts of the Integrate client so a page can fan out dozens of
+# quote/history requests at once. The blocking HTTP calls run on worker threads
+# over the shared keep-alive pool. The event loop itself runs on the Streamlit
+# script thread, so coroutine bodies may read st.session_state; functions handed
+# to run_blocking run without a ScriptRunContext (session_state is empty there),
+# so read headers and secrets in the coroutine and pass them in.
+
+MAX_CONCURRENCY = 16
+
+# Dedicated workers for blocking I/O; the default executor is sized by CPU
+# count, which is far too small for network-bound fan-out
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="integrate-io")
+
+async def run_blocking(func, *args, **kwargs):
+    """Await a blocking call (e.g. an existing get_ltp) on a worker thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+async def integrate_get_async(path):
+    headers = get_session_headers()
+    cached = response_cache.get(headers, path)
+    if cached is not None:
+        return cached
+    url = INTEGRATE_BASE_URL + path
+    tracing.log_request("GET", url, headers)
+    try:
+        resp = await run_blocking(http_get, url, headers=headers, timeout=15)
+        data = handle_integrate_response(resp, "GET")
+        response_cache.put(headers, path, data)
+        return data
+    except Exception as e:
+        tracing.logger.debug("GET %s error: %s", path, e)
+        stale = response_cache.get_stale(headers, path)
+        if stale is not None:
+            return stale
+        return {"status": "ERROR", "message": str(e)}
+
+async def integrate_post_async(path, payload):
+    headers = get_session_headers()
+    url = INTEGRATE_BASE_URL + path
+    tracing.log_request("POST", url, headers, payload)
+    try:
+        resp = await run_blocking(http_post, url, json=payload, headers=headers, timeout=15)
+        data = handle_integrate_response(resp, "POST")
+        if data.get("status") != "ERROR":
+            response_cache.invalidate_after(headers, path)
+        return data
+    except Exception as e:
+        tracing.logger.debug("POST %s error: %s", path, e)
+        return {"status": "ERROR", "message": str(e)}
+
+async def gather_limited(coros, limit=None):
+    """Await coroutines concurrently, at most `limit` in flight; results keep input order"""
+    sem = asyncio.Semaphore(limit or MAX_CONCURRENCY)
+
+    async def _run(coro):
+        async with sem:
+            return await coro
+
+    return await asyncio.gather(*(_run(c) for c in coros))
+
+def run_all(coros, limit=None):
+    """Run coroutines on one event loop from synchronous page code"""
+    coros = list(coros)
+    if not coros:
+        return []
+    return asyncio.run(gather_limited(coros, limit))
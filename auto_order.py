@@ -1,5 +1,6 @@
 import logging
-from quotes import get_circuit_limits
+import instruments
+from quotes import get_circuit_limits, CircuitLimitsUnavailable
 from holdings import get_holdings
 from positions import get_positions
 from utils import integrate_post
@@ -12,7 +13,11 @@ def snap_to_tick(price, tick_size):
 
 def can_place_gtt(symbol, trigger_price):
     """Check if trigger price is within circuit limits"""
-    lower, upper = get_circuit_limits(symbol)
+    try:
+        lower, upper = get_circuit_limits(symbol)
+    except CircuitLimitsUnavailable as e:
+        logging.error(f"GTT order skipped: {e}")
+        return False, "CIRCUIT LIMITS UNAVAILABLE"
     if not (lower <= trigger_price <= upper):
         logging.error(
             f"GTT order rejected: {symbol} trigger price {trigger_price} outside circuit limits ({lower}-{upper})"
@@ -87,7 +92,7 @@ def main():
         exchange = p.get("exchange")
         product_type = p.get("product_type") or p.get("productType") or p.get("Product") or "INTRADAY"
         entry_price = float(p.get("day_buy_avg") or p.get("total_buy_avg") or 0.0)
-        tick_size = float(p.get("ticksize") or 0.05)
+        tick_size = float(p.get("ticksize") or instruments.load().tick_size(symbol, exchange) or 0.05)
 
         if entry_price > 0:
             place_oco_order(symbol, exchange, qty, entry_price, tick_size, product_type)
@@ -104,7 +109,7 @@ def main():
                 continue
             symbol = ts_info.get("tradingsymbol", "")
             exchange = ts_info.get("exchange", "")
-            tick_size = float(ts_info.get("ticksize", "0.05"))
+            tick_size = float(ts_info.get("ticksize") or instruments.load().tick_size(symbol, exchange) or 0.05)
             product_type = "CNC"
             entry_price = avg_buy_price if avg_buy_price > 0.0 else 0.0
 
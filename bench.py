@@ -0,0 +1,158 @@
+"""Micro-benchmarks for the candle pipeline and the shared reference data.
+
+    python bench.py --bars 5000 --repeat 50
+    python bench.py --memory --symbols 2000 --bars 600
+    python bench.py --reference --repeat 20
+"""
+import argparse
+import io
+import json
+import pickle
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import history
+import instruments
+import symbol_search
+
+def synthetic_csv(bars, seed=1):
+    """Broker-format day candles ("ddmmYYYYHHMM,o,h,l,c,v,oi"), one per weekday"""
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64("1990-01-01"), np.datetime64("1990-01-01") + bars * 2, dtype="datetime64[D]")
+    days = days[np.is_busday(days)][:bars]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    volume = rng.integers(1_000, 1_000_000, bars)
+    lines = [
+        f"{d.astype(object).strftime('%d%m%Y')}0000,{c * 0.99:.2f},{c * 1.01:.2f},{c * 0.98:.2f},{c:.2f},{v},0"
+        for d, c, v in zip(days, close, volume)
+    ]
+    return "\n".join(lines) + "\n"
+
+def legacy_parse(text):
+    # The per-page parser history.parse_candles replaced
+    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
+    df = pd.read_csv(io.StringIO(text), header=None, names=cols)
+    df = df[df["Dateandtime"].notnull()]
+    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
+    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
+    df = df.dropna(subset=["Date"])
+    for col in ["Open", "High", "Low", "Close", "Volume"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+def fast_parse(text):
+    return history.to_frame(history.parse_candles(text))
+
+def time_per_1000_bars(fn, text, bars, repeat):
+    fn(text)   # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) / bars * 1000 * 1e6, 1)
+
+def bench_parse(bars, repeat):
+    text = synthetic_csv(bars)
+    legacy = time_per_1000_bars(legacy_parse, text, bars, repeat)
+    fast = time_per_1000_bars(fast_parse, text, bars, repeat)
+    return {
+        "bench": "parse_candles",
+        "bars": bars,
+        "legacy_us_per_1000_bars": legacy,
+        "fast_us_per_1000_bars": fast,
+        "speedup": round(legacy / fast, 2) if fast else None,
+    }
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def compact_bytes(data):
+    return sum(array.nbytes for array in data.values())
+
+def bench_memory(bars, symbols):
+    """Resident size of one symbol's history, legacy frame vs compact columns"""
+    text = synthetic_csv(bars)
+    legacy = frame_bytes(legacy_parse(text))
+    data = history.parse_candles(text)
+    compact = compact_bytes(data)
+    return {
+        "bench": "candle_memory",
+        "bars": bars,
+        "legacy_bytes_per_bar": round(legacy / bars, 1),
+        "compact_bytes_per_bar": round(compact / bars, 1),
+        "frame_bytes_per_bar": round(frame_bytes(history.to_frame(data)) / bars, 1),
+        "symbols": symbols,
+        "legacy_universe_mb": round(legacy * symbols / 1024 / 1024, 1),
+        "compact_universe_mb": round(compact * symbols / 1024 / 1024, 1),
+        "reduction": round(legacy / compact, 2),
+    }
+
+def legacy_rerun(master_df, exchange, symbol):
+    # What a page rerun did with the @st.cache_data master: a fresh unpickled
+    # copy, a filtered copy per exchange, the full symbol list for a
+    # selectbox and a str.upper() scan for the token
+    df = pickle.loads(pickle.dumps(master_df))
+    df_exch = df[df["segment"] == exchange]
+    options = sorted(df_exch["symbol"].dropna().unique().tolist())
+    row = df[(df["symbol"].str.upper() == symbol) & (df["segment"].str.upper() == exchange)]
+    return options, row.iloc[0]["token"] if not row.empty else None
+
+def shared_rerun(exchange, symbol):
+    master = instruments.load()
+    index = symbol_search.index_for(master)
+    rows = index.search(symbol, symbol_search.DEFAULT_LIMIT, index.allowed(master.segment(exchange)))
+    options = [symbol_search.describe(master, row) for row in rows]
+    return options, master.token(symbol, exchange)
+
+def allocated(fn, repeat):
+    """(peak bytes allocated by one call, seconds per call); tracemalloc is running"""
+    fn()    # warm up: caches and lazy indexes are built once, not per rerun
+    peaks, timings = [], []
+    for _ in range(repeat):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    return min(peaks), min(timings)
+
+def bench_reference(repeat, exchange="NSE", symbol="SBIN"):
+    """Per-rerun allocation of a master lookup page, cache_data copies vs the shared master"""
+    master_df = pd.read_csv(instruments.MASTER_FILE, sep="\t", header=None)
+    master_df.columns = instruments.COLUMNS[:master_df.shape[1]]
+    tracemalloc.start()
+    try:
+        legacy, legacy_s = allocated(lambda: legacy_rerun(master_df, exchange, symbol), repeat)
+        shared, shared_s = allocated(lambda: shared_rerun(exchange, symbol), repeat)
+    finally:
+        tracemalloc.stop()
+    return {
+        "bench": "reference_rerun",
+        "instruments": len(master_df),
+        "legacy_kb_per_rerun": round(legacy / 1024, 1),
+        "shared_kb_per_rerun": round(shared / 1024, 1),
+        "legacy_ms_per_rerun": round(legacy_s * 1000, 2),
+        "shared_ms_per_rerun": round(shared_s * 1000, 2),
+        "reduction": round(legacy / shared, 1) if shared else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Candle pipeline micro-benchmarks")
+    parser.add_argument("--bars", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--memory", action="store_true", help="report candle memory instead of parse time")
+    parser.add_argument("--symbols", type=int, default=2000, help="universe size for --memory")
+    parser.add_argument("--reference", action="store_true", help="report per-rerun allocation of master lookups")
+    args = parser.parse_args()
+    if args.reference:
+        print(json.dumps(bench_reference(args.repeat)))
+    elif args.memory:
+        print(json.dumps(bench_memory(args.bars, args.symbols)))
+    else:
+        print(json.dumps(bench_parse(args.bars, args.repeat)))
+
+if __name__ == "__main__":
+    main()
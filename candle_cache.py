@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+
+# In-process LRU of stored candle series, shared by every Streamlit session in
+# the process. candle_store reads through it and writes through to it, so the
+# Nifty 500 benchmark or a popular symbol is decoded from disk once instead of
+# on every rerun. Entries are capped by total array bytes, not by count.
+# Cached arrays are marked read-only; callers must not modify them.
+
+BUDGET_BYTES = int(float(os.environ.get("CANDLE_CACHE_MB", "256")) * 1024 * 1024)
+
+_entries = OrderedDict()   # key -> (value, nbytes)
+_lock = threading.Lock()
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _size(value):
+    data = value[0]
+    return sum(array.nbytes for array in data.values())
+
+def configure(budget_mb=None):
+    global BUDGET_BYTES
+    if budget_mb is not None:
+        BUDGET_BYTES = int(budget_mb * 1024 * 1024)
+        with _lock:
+            _evict()
+
+def _evict():
+    global _bytes
+    while _bytes > BUDGET_BYTES and _entries:
+        _, (_, nbytes) = _entries.popitem(last=False)
+        _bytes -= nbytes
+        _stats["evictions"] += 1
+
+def get(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return entry[0]
+
+def put(key, value):
+    """value is (data, covered_from, covered_to) as returned by candle_store.load"""
+    global _bytes
+    for array in value[0].values():
+        array.flags.writeable = False
+    nbytes = _size(value)
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _bytes -= old[1]
+        if nbytes > BUDGET_BYTES:
+            return
+        _entries[key] = (value, nbytes)
+        _bytes += nbytes
+        _evict()
+
+def clear():
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _bytes = 0
+
+def stats():
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        return dict(
+            _stats,
+            entries=len(_entries),
+            mb_used=round(_bytes / 1024 / 1024, 2),
+            mb_budget=round(BUDGET_BYTES / 1024 / 1024, 2),
+            hit_rate=round(hits / (hits + misses), 3) if hits + misses else None,
+        )
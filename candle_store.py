@@ -0,0 +1,86 @@
+import os
+import threading
+import numpy as np
+import candle_cache
+
+# On-disk OHLCV store for SDS history, one columnar .npz per
+# segment/timeframe/token. Each file also records the time range already
+# requested from the broker, so history.fetch_candles_definedge only fetches
+# what lies outside it: normally just the bars since the last stored one
+# (the last bar is fetched again because today's candle is still forming).
+#
+# Bars are compact column dicts: "ts" int32 minutes since epoch (ts // 1440
+# is the day ordinal), float32 open/high/low/close and int64 volume, 28 bytes
+# a bar. The broker's OI field is not kept; no page uses it.
+
+STORE_DIR = os.environ.get("CANDLE_STORE_DIR", "candle_store")
+COLUMNS = ("open", "high", "low", "close", "volume")
+DTYPES = {"ts": np.int32, "open": np.float32, "high": np.float32, "low": np.float32,
+          "close": np.float32, "volume": np.int64}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+def lock_for(segment, token, timeframe):
+    key = (segment, token, timeframe)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+def _path(segment, token, timeframe):
+    return os.path.join(STORE_DIR, segment, timeframe, f"{token}.npz")
+
+def empty():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in DTYPES.items()}
+
+def compact(data):
+    """Cast bar columns to the store dtypes (missing volume counts as 0)"""
+    out = {}
+    for name, dtype in DTYPES.items():
+        values = data[name]
+        if name == "volume" and values.dtype.kind == "f":
+            values = np.nan_to_num(values)
+        out[name] = values.astype(dtype, copy=False)
+    return out
+
+def load(segment, token, timeframe, cache=True):
+    """Stored bars plus the covered (from, to) range in minutes, or (None, None, None)
+
+    Bulk readers pass cache=False so they do not flush the shared LRU.
+    """
+    if cache:
+        cached = candle_cache.get((segment, token, timeframe))
+        if cached is not None:
+            return cached
+    path = _path(segment, token, timeframe)
+    try:
+        with np.load(path) as f:
+            # Files written before the compact layout are cast on read
+            data = compact({name: f[name] for name in DTYPES})
+            value = data, int(f["covered_from"]), int(f["covered_to"])
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None, None, None
+    if cache:
+        candle_cache.put((segment, token, timeframe), value)
+    return value
+
+def save(segment, token, timeframe, data, covered_from, covered_to):
+    path = _path(segment, token, timeframe)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp.npz"
+    np.savez(tmp, covered_from=covered_from, covered_to=covered_to, **data)
+    os.replace(tmp, path)
+    candle_cache.put((segment, token, timeframe), (data, covered_from, covered_to))
+
+def merge(old, new):
+    # Newer bars replace stored ones with the same timestamp
+    ts = np.concatenate([new["ts"], old["ts"]])
+    _, first = np.unique(ts, return_index=True)
+    return {name: np.concatenate([new[name], old[name]])[first] for name in DTYPES}
+
+def slice_range(data, from_min, to_min):
+    lo = np.searchsorted(data["ts"], from_min)
+    hi = np.searchsorted(data["ts"], to_min, side="right")
+    return {name: values[lo:hi] for name, values in data.items()}
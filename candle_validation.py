@@ -0,0 +1,111 @@
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+import trading_calendar
+
+# Ingestion checks for broker candles. history.download runs every batch
+# through validate() before it is merged into candle_store, so bars are
+# checked once when they arrive and every reader gets clean, sorted,
+# de-duplicated arrays without filtering them again:
+#
+#   non-numeric   a price field blank or unparseable        -> bar dropped
+#   duplicate     the same timestamp sent twice             -> last copy kept
+#   future        stamped after the time of the request     -> bar dropped
+#   ohlc          high/low not enclosing open and close     -> high/low widened
+#   missing       a trading session with no daily bar       -> flagged only
+#
+# Missing sessions are not invented: a suspended or newly listed symbol
+# legitimately has none. They are logged and counted for the trace page.
+
+logger = logging.getLogger("integrate")
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+MAX_FLAGGED = 200
+
+_lock = threading.Lock()
+_stats = {"batches": 0, "bars": 0, "non_numeric": 0, "duplicate": 0, "future": 0, "ohlc": 0, "missing": 0}
+_flagged = {}   # (segment, token, timeframe) -> last report with problems
+
+def _missing_sessions(ts, timeframe, from_min, to_min):
+    if timeframe != "day" or from_min is None or to_min is None:
+        return np.empty(0, dtype="datetime64[D]")
+    start = np.datetime64(int(from_min) // 1440, "D")
+    if len(ts):
+        # Before the first bar the symbol may simply not have been listed yet
+        start = max(start, np.datetime64(int(ts[0]) // 1440, "D"))
+    # Holidays are only listed from KNOWN_FROM; today's bar may not be published yet
+    start = max(start, trading_calendar.KNOWN_FROM)
+    end = min(np.datetime64(int(to_min) // 1440, "D"), np.datetime64(datetime.now().date()) - 1)
+    if start > end:
+        return np.empty(0, dtype="datetime64[D]")
+    sessions = trading_calendar.trading_days(start, end)
+    return sessions[~np.isin(sessions, (ts // 1440).astype("datetime64[D]"))]
+
+def validate(data, timeframe, from_min=None, to_min=None, now_min=None):
+    """Compact candle columns sorted by ts -> (clean columns, report)
+
+    from_min/to_min is the requested range, used to look for missing sessions.
+    """
+    if now_min is None:
+        now_min = int(np.datetime64(datetime.now(), "m").astype(np.int64))
+    ts = data["ts"]
+    non_numeric = np.zeros(len(ts), dtype=bool)
+    for col in PRICE_COLUMNS:
+        non_numeric |= np.isnan(data[col])
+    future = ts > now_min
+    clean = {name: values[~(non_numeric | future)] for name, values in data.items()}
+
+    # ts is sorted, so repeats are adjacent; keep the last copy the broker sent
+    ts = clean["ts"]
+    duplicate = np.zeros(len(ts), dtype=bool)
+    duplicate[:-1] = ts[1:] == ts[:-1]
+    if duplicate.any():
+        clean = {name: values[~duplicate] for name, values in clean.items()}
+
+    body_high = np.maximum(clean["open"], clean["close"])
+    body_low = np.minimum(clean["open"], clean["close"])
+    ohlc = (clean["high"] < body_high) | (clean["low"] > body_low)
+    if ohlc.any():
+        clean["high"] = np.maximum(clean["high"], body_high)
+        clean["low"] = np.minimum(clean["low"], body_low)
+
+    missing = _missing_sessions(clean["ts"], timeframe, from_min, to_min)
+    report = {
+        "bars": int(len(data["ts"])),
+        "non_numeric": int(non_numeric.sum()),
+        "duplicate": int(duplicate.sum()),
+        "future": int((future & ~non_numeric).sum()),
+        "ohlc": int(ohlc.sum()),
+        "missing": int(len(missing)),
+        "missing_sessions": ", ".join(str(day) for day in missing[:10]),
+    }
+    return clean, report
+
+def record(segment, token, timeframe, report):
+    """Add a report to the running totals; log and keep it if anything was wrong"""
+    problems = {key: report[key] for key in ("non_numeric", "duplicate", "future", "ohlc", "missing") if report[key]}
+    with _lock:
+        _stats["batches"] += 1
+        _stats["bars"] += report["bars"]
+        for key, count in problems.items():
+            _stats[key] += count
+        if problems:
+            _flagged.pop((segment, token, timeframe), None)
+            _flagged[(segment, token, timeframe)] = report
+            while len(_flagged) > MAX_FLAGGED:
+                _flagged.pop(next(iter(_flagged)))
+    if problems:
+        logger.warning("candle validation %s/%s/%s: %s", segment, token, timeframe, problems)
+
+def stats():
+    with _lock:
+        return dict(_stats, flagged=len(_flagged))
+
+def flagged():
+    """Most recent problem report per instrument, newest last"""
+    with _lock:
+        return [
+            dict(segment=segment, token=token, timeframe=timeframe, **report)
+            for (segment, token, timeframe), report in _flagged.items()
+        ]
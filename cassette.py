@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Record/replay of broker traffic for offline profiling.
+#
+#   INTEGRATE_CASSETTE_MODE=record   real calls, responses saved to INTEGRATE_CASSETTE_DIR
+#   INTEGRATE_CASSETTE_MODE=replay   no network, saved responses served back
+#   INTEGRATE_CASSETTE_LATENCY_MS    synthetic latency on replay, "40" or "20-80"
+#
+# Each response is one gzipped JSON file named by a hash of method, URL and
+# body. History URLs are keyed without their from/to range (which changes
+# every minute) so a recording keeps replaying on later days.
+
+MODE = os.environ.get("INTEGRATE_CASSETTE_MODE", "").lower()
+CASSETTE_DIR = os.environ.get("INTEGRATE_CASSETTE_DIR", "cassettes")
+LATENCY_MS = os.environ.get("INTEGRATE_CASSETTE_LATENCY_MS", "0")
+
+_HISTORY_RANGE = re.compile(r"(/sds/history/[^/]+/[^/]+/[^/]+)/[^/]+/[^/]+$")
+_write_lock = threading.Lock()
+_stats = {"recorded": 0, "replayed": 0, "missed": 0}
+
+def configure(mode=None, directory=None, latency_ms=None):
+    global MODE, CASSETTE_DIR, LATENCY_MS
+    if mode is not None:
+        MODE = mode.lower()
+    if directory is not None:
+        CASSETTE_DIR = directory
+    if latency_ms is not None:
+        LATENCY_MS = str(latency_ms)
+
+def is_recording():
+    return MODE == "record"
+
+def is_replaying():
+    return MODE == "replay"
+
+def _key_url(url):
+    return _HISTORY_RANGE.sub(r"\1", url.split("?", 1)[0])
+
+def _path_for(method, url, payload):
+    key_url = _key_url(url)
+    body = json.dumps(payload, sort_keys=True) if payload is not None else ""
+    digest = hashlib.sha1(f"{method} {key_url} {body}".encode("utf-8")).hexdigest()[:20]
+    host = key_url.split("://", 1)[-1].split("/", 1)[0].replace(":", "_")
+    return os.path.join(CASSETTE_DIR, host, digest + ".json.gz")
+
+def _synthetic_latency():
+    low, _, high = LATENCY_MS.partition("-")
+    low = float(low or 0)
+    high = float(high) if high else low
+    delay = random.uniform(low, high) / 1000
+    if delay > 0:
+        time.sleep(delay)
+
+def record(method, url, payload, resp):
+    path = _path_for(method, url, payload)
+    entry = {
+        "method": method,
+        "url": _key_url(url),
+        "status": resp.status_code,
+        "content_type": resp.headers.get("Content-Type", ""),
+        "body": resp.content.decode("utf-8", errors="replace"),
+    }
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        _stats["recorded"] += 1
+
+def _response(method, url, payload, status, body, content_type):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body.encode("utf-8")
+    resp.encoding = "utf-8"
+    resp.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    resp.url = url
+    resp.request = requests.Request(method, url, json=payload).prepare()
+    return resp
+
+def replay(method, url, payload=None):
+    """Recorded response for the request, or a 404 ERROR response if none"""
+    _synthetic_latency()
+    path = _path_for(method, url, payload)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        _stats["missed"] += 1
+        body = json.dumps({"status": "ERROR", "message": f"No cassette recorded for {method} {_key_url(url)}"})
+        return _response(method, url, payload, 404, body, "application/json")
+    _stats["replayed"] += 1
+    return _response(method, url, payload, entry["status"], entry["body"], entry["content_type"])
+
+def stats():
+    return dict(_stats, mode=MODE or "off", directory=CASSETTE_DIR)
@@ -0,0 +1,89 @@
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+
+# Per-host circuit breaker. After FAILURE_THRESHOLD consecutive connection
+# errors/timeouts/5xx the circuit opens and calls fail immediately for
+# RESET_TIMEOUT seconds; then a single probe request is let through
+# (half-open) and its outcome closes or re-opens the circuit.
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError instead of letting a doomed request through.
+
+        Returns True when the call is the half-open probe.
+        """
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return False
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            raise CircuitOpenError(f"{self.name} unavailable (circuit open after {self._failures} failures)")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """End an admitted probe whose outcome was not recorded, so the next call can probe"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {"host": self.name, "state": self._state(time.monotonic()), "failures": self._failures}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(url):
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+def all_stats():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.stats() for b in breakers]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# Shared date axis for daily bars. A trading date is interned once as an int32
+# day ordinal (days since 1970-01-01, the same value as candle_store's
+# ts // 1440 and the price panel's dates), so every symbol and the Nifty 500
+# benchmark sit on one axis. Aligning two series is then offset arithmetic
+# into a dense array rather than a pd.merge on Date per symbol. Weekends and
+# holidays are just empty slots: budget-day and Muhurat sessions can fall on
+# them, so the axis does not skip them.
+
+def from_dates(dates):
+    """datetime64 values (a frame's Date column) -> day ordinals"""
+    return np.asarray(dates).astype("datetime64[D]").astype(np.int32)
+
+class Series:
+    """One daily series laid out densely on the axis, NaN where it has no bar"""
+
+    def __init__(self, ordinals, values):
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        self.start = int(ordinals[0]) if len(ordinals) else 0
+        size = int(ordinals[-1]) - self.start + 1 if len(ordinals) else 0
+        self.values = np.full(size, np.nan)
+        self.values[ordinals - self.start] = values
+
+    @classmethod
+    def from_frame(cls, df, column="Close"):
+        if df is None or df.empty:
+            return cls([], [])
+        return cls(from_dates(df["Date"].values), df[column].to_numpy(dtype=np.float64))
+
+    def at(self, ordinals):
+        """Values on the given ordinals (any shape), NaN outside the series"""
+        pos = np.asarray(ordinals, dtype=np.int64) - self.start
+        inside = (pos >= 0) & (pos < len(self.values))
+        out = np.full(pos.shape, np.nan)
+        out[inside] = self.values[pos[inside]]
+        return out
+
+def relative_strength(stock_df, index_df):
+    """stock Close / index Close on the dates both have, indexed by Date"""
+    index_close = Series.from_frame(index_df).at(from_dates(stock_df["Date"].values))
+    ratio = stock_df["Close"].to_numpy(dtype=np.float64) / index_close
+    keep = ~np.isnan(ratio)
+    return pd.Series(ratio[keep], index=pd.DatetimeIndex(stock_df["Date"].values[keep], name="Date"))
@@ -1,12 +1,17 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import requests
-import io
-from datetime import datetime, timedelta
+import history
+from history import fetch_candles_definedge
+import price_panel
+import date_axis
+import instruments
+import trading_calendar
+from datetime import datetime
 import plotly.graph_objs as go
 
-from master_loader import load_watchlist
+import prefetch
+import watchlists
 
 WATCHLIST_FILES = [
     "master.csv",
@@ -17,41 +22,24 @@ WATCHLIST_FILES = [
     "watchlist_6.csv",
     "watchlist_7.csv",
 ]
+ALL_WATCHLISTS = "All watchlists"
+COMBINE_OPS = {"Union": watchlists.union, "Intersection": watchlists.intersection, "Difference": watchlists.difference}
 
 NIFTY500_SYMBOL = "nifty 500"
 
-def fetch_candles_definedge(segment, token, timeframe, from_dt, to_dt, api_key):
-    url = f"https://data.definedgesecurities.com/sds/history/{segment}/{token}/{timeframe}/{from_dt}/{to_dt}"
-    headers = {"Authorization": api_key}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        raise Exception(f"API error: {resp.status_code} {resp.text}")
-    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
-    df = pd.read_csv(io.StringIO(resp.text), header=None, names=cols)
-    df = df[df["Dateandtime"].notnull()]
-    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
-    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
-    df = df.dropna(subset=["Date"])
-    df = df[df['Date'] <= pd.Timestamp.today()]
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
-
-def get_time_range(days, endtime="1530"):
-    to = datetime.now()
-    try:
-        to = to.replace(hour=int(endtime[:2]), minute=int(endtime[2:]), second=0, microsecond=0)
-    except Exception:
-        pass
-    frm = to - timedelta(days=days)
-    return frm.strftime("%d%m%Y%H%M"), to.strftime("%d%m%Y%H%M")
+def get_nifty500_row(master):
+    row = master.find(NIFTY500_SYMBOL, "NSE")
+    return master.record(row) if row is not None else None
 
-def get_nifty500_row(master_df):
-    for idx, row in master_df.iterrows():
-        symbol = str(row.get('symbol', '')).strip().lower()
-        if symbol == NIFTY500_SYMBOL:
-            return row
-    return None
+def watchlist_ids(selected, combine_op=None, combine_with=()):
+    """Master row ids for the sidebar selection, combined with other lists by set algebra"""
+    if selected == ALL_WATCHLISTS:
+        ids = watchlists.union(*[watchlists.load(f) for f in WATCHLIST_FILES[1:]])
+    else:
+        ids = watchlists.load(selected)
+    if combine_op and combine_with:
+        ids = COMBINE_OPS[combine_op](ids, *[watchlists.load(f) for f in combine_with])
+    return ids
 
 def compute_ema(series, period):
     return series.ewm(span=period, adjust=False).mean()
@@ -66,13 +54,153 @@ def compute_rsi(series, period=14):
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
+def _match(
+    symbol, company, segment, token, ltp, ema20, ema50, rsi14, rs_score, rs_flag,
+    ema_ltp_thr, ema_ratio_thr, rsi_enabled, rsi_threshold, rsi_direction,
+    ema_scan_enabled, ema_condition, show_rs
+):
+    # Result row for a symbol that passes every enabled filter, else None
+    rsi_status = ""
+    if rsi_enabled and rsi_threshold is not None:
+        if rsi_direction == "Above" and rsi14 > rsi_threshold:
+            rsi_status = f"RSI {rsi14:.1f} > {rsi_threshold}"
+        elif rsi_direction == "Below" and rsi14 < rsi_threshold:
+            rsi_status = f"RSI {rsi14:.1f} < {rsi_threshold}"
+        else:
+            return None
+
+    ema_status = ""
+    if ema_scan_enabled:
+        if ema_condition == "Price above 20EMA" and ltp > ema20:
+            ema_status = "LTP > 20EMA"
+        elif ema_condition == "Price below 20EMA" and ltp < ema20:
+            ema_status = "LTP < 20EMA"
+        elif ema_condition == "20EMA above 50EMA" and ema20 > ema50:
+            ema_status = "20EMA > 50EMA"
+        elif ema_condition == "20EMA below 50EMA" and ema20 < ema50:
+            ema_status = "20EMA < 50EMA"
+        else:
+            return None
+
+    ema20_ltp = ema20 / ltp if ltp else np.nan
+    ema50_ema20 = ema50 / ema20 if ema20 else np.nan
+    if not ((ema20_ltp > ema_ltp_thr) and (ema50_ema20 > ema_ratio_thr)):
+        return None
+    return {
+        "Symbol": symbol,
+        "Company": company,
+        "LTP": ltp,
+        "20EMA": round(ema20, 2),
+        "50EMA": round(ema50, 2),
+        "RSI14": round(rsi14, 2),
+        "RS_Score": round(rs_score, 3) if show_rs and not np.isnan(rs_score) else "",
+        "RS_Flag": rs_flag if show_rs else "",
+        "EMA_Scan": ema_status,
+        "RSI_Scan": rsi_status,
+        "segment": segment,
+        "token": token
+    }
+
+def _ema_last(values, period):
+    # values: symbols x bars, right-aligned (leading NaNs); same recursion as ewm(adjust=False)
+    alpha = 2 / (period + 1)
+    ema = values[:, 0].copy()
+    for t in range(1, values.shape[1]):
+        x = values[:, t]
+        ema = np.where(np.isnan(ema), x, ema + alpha * (x - ema))
+    return ema
+
+def scan_panel(panel, master_df, from_dt, to_dt, nifty_df, benchmark, show_rs, match_args):
+    """Vectorized scan of the rows the price panel covers.
+
+    Returns (results as (index, record) pairs, rows the panel could not serve).
+    """
+    from_min, to_min = history.to_minutes(from_dt), min(history.to_minutes(to_dt), history.to_minutes(datetime.now()))
+    positions, rows, pending = [], [], []
+    for idx, segment, token in zip(master_df.index, master_df["segment"], master_df["token"]):
+        row = panel.row(segment, token)
+        if row is None or not panel.covers(row, from_min, to_min):
+            pending.append(idx)
+        else:
+            positions.append(idx)
+            rows.append(row)
+    if not rows:
+        return [], master_df.loc[pending]
+
+    rows = np.array(rows)
+    cols = panel.columns(from_min, to_min)
+    days = panel.days[cols]
+    close = np.round(panel.close[rows, cols].astype(np.float64), 2)
+    # Per-symbol bar times, so the window edges match the per-symbol fetch exactly
+    ts = days[None, :] * 1440 + panel.time_of_day[rows].astype(np.int64)[:, None]
+    close[(ts < from_min) | (ts > to_min)] = np.nan
+    has_bar = ~np.isnan(close)
+    counts = has_bar.sum(axis=1)
+
+    # Right-align each symbol's bars so column -1 is its last bar, as in its own DataFrame
+    order = np.argsort(has_bar, axis=1, kind="stable")
+    aligned = np.take_along_axis(close, order, axis=1)
+    ltp = aligned[:, -1]
+    ema20 = _ema_last(aligned, 20)
+    ema50 = _ema_last(aligned, 50)
+    delta = np.diff(aligned[:, -15:], axis=1)
+    ma_up = np.clip(delta, 0, None).mean(axis=1)
+    ma_down = np.clip(-delta, 0, None).mean(axis=1)
+    rsi14 = 100 - (100 / (1 + ma_up / (ma_down + 1e-10)))
+
+    rs_score = np.full(len(rows), np.nan)
+    if show_rs and nifty_df is not None and not nifty_df.empty:
+        nifty_close = benchmark.at(days)
+        common = has_bar & ~np.isnan(nifty_close)[None, :]
+        enough = common.sum(axis=1) >= 2
+        first = common.argmax(axis=1)
+        last = common.shape[1] - 1 - common[:, ::-1].argmax(axis=1)
+        picked = np.arange(len(rows))
+        stock_return = close[picked, last] / close[picked, first]
+        nifty_return = nifty_close[last] / nifty_close[first]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs_score = np.where(enough & (nifty_return != 0), stock_return / nifty_return, np.nan)
+
+    results = []
+    for i in np.flatnonzero(counts >= 50):
+        idx = positions[i]
+        row = master_df.loc[idx]
+        symbol = row["symbol"]
+        if str(symbol).strip().lower() == NIFTY500_SYMBOL:
+            continue
+        rs_flag = ""
+        if show_rs and nifty_df is not None and not nifty_df.empty:
+            if not np.isnan(rs_score[i]):
+                rs_flag = "Outperform" if rs_score[i] > 1 else "Underperform"
+        elif show_rs:
+            rs_flag = "Nifty 500 data unavailable"
+        record = _match(
+            symbol, row["company"] if "company" in row else "", row["segment"], row["token"],
+            round(float(ltp[i]), 2), float(ema20[i]), float(ema50[i]), float(rsi14[i]), float(rs_score[i]), rs_flag,
+            *match_args
+        )
+        if record is not None:
+            results.append((idx, record))
+    return results, master_df.loc[pending]
+
 def scan_symbols(
-    master_df, api_key, updown_window=15, days=120, ema_ltp_thr=0.95, ema_ratio_thr=0.95,
+    master_df, api_key, updown_window=15, bars=80, ema_ltp_thr=0.95, ema_ratio_thr=0.95,
     rsi_enabled=False, rsi_threshold=None, rsi_direction="Above",
     ema_scan_enabled=False, ema_condition="Price above 20EMA", show_rs=True,
     nifty_df=None  # Pass the already-fetched Nifty 500 df for RS calc
 ):
+    match_args = (
+        ema_ltp_thr, ema_ratio_thr, rsi_enabled, rsi_threshold, rsi_direction,
+        ema_scan_enabled, ema_condition, show_rs
+    )
+    from_dt, to_dt = trading_calendar.time_range_for_bars(bars)
+    # Nifty 500 laid out on the shared date axis once, instead of a merge per symbol
+    benchmark = date_axis.Series.from_frame(nifty_df)
     result = []
+    # Symbols already in the price panel are scanned in one vectorized pass
+    panel = price_panel.load()
+    if panel is not None:
+        result, master_df = scan_panel(panel, master_df, from_dt, to_dt, nifty_df, benchmark, show_rs, match_args)
     for idx, row in master_df.iterrows():
         segment = row['segment']
         token = row['token']
@@ -81,7 +209,6 @@ def scan_symbols(
         if str(symbol).strip().lower() == NIFTY500_SYMBOL:
             continue  # Skip Nifty 500 itself
         try:
-            from_dt, to_dt = get_time_range(days)
             df = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key)
             if len(df) < 50:
                 continue
@@ -93,72 +220,33 @@ def scan_symbols(
             ema50 = df["EMA50"].iloc[-1]
             rsi14 = df["RSI14"].iloc[-1]
 
-            rsi_status = ""
-            if rsi_enabled and rsi_threshold is not None:
-                if rsi_direction == "Above" and rsi14 > rsi_threshold:
-                    rsi_status = f"RSI {rsi14:.1f} > {rsi_threshold}"
-                elif rsi_direction == "Below" and rsi14 < rsi_threshold:
-                    rsi_status = f"RSI {rsi14:.1f} < {rsi_threshold}"
-                else:
-                    continue
-
-            ema_status = ""
-            if ema_scan_enabled:
-                if ema_condition == "Price above 20EMA" and ltp > ema20:
-                    ema_status = "LTP > 20EMA"
-                elif ema_condition == "Price below 20EMA" and ltp < ema20:
-                    ema_status = "LTP < 20EMA"
-                elif ema_condition == "20EMA above 50EMA" and ema20 > ema50:
-                    ema_status = "20EMA > 50EMA"
-                elif ema_condition == "20EMA below 50EMA" and ema20 < ema50:
-                    ema_status = "20EMA < 50EMA"
-                else:
-                    continue
-
             # RS Calculation
             rs_score, rs_flag = np.nan, ""
             if show_rs and nifty_df is not None and not nifty_df.empty:
-                merged = pd.merge(
-                    df[["Date", "Close"]],
-                    nifty_df[["Date", "Close"]].rename(columns={"Close": "NiftyClose"}),
-                    on="Date",
-                    how="inner"
-                )
-                if len(merged) >= 2:
-                    stock_return = merged["Close"].iloc[-1] / merged["Close"].iloc[0]
-                    nifty_return = merged["NiftyClose"].iloc[-1] / merged["NiftyClose"].iloc[0]
+                close = df["Close"].to_numpy(dtype=np.float64)
+                nifty_close = benchmark.at(date_axis.from_dates(df["Date"].values))
+                common = np.flatnonzero(~np.isnan(nifty_close))
+                if len(common) >= 2:
+                    first, last = common[0], common[-1]
+                    stock_return = close[last] / close[first]
+                    nifty_return = nifty_close[last] / nifty_close[first]
                     if nifty_return != 0:
                         rs_score = stock_return / nifty_return
                         rs_flag = "Outperform" if rs_score > 1 else "Underperform"
             elif show_rs:
                 rs_flag = "Nifty 500 data unavailable"
 
-            ema20_ltp = ema20 / ltp if ltp else np.nan
-            ema50_ema20 = ema50 / ema20 if ema20 else np.nan
-            if (
-                (ema20_ltp > ema_ltp_thr) and
-                (ema50_ema20 > ema_ratio_thr)
-            ):
-                result.append({
-                    "Symbol": symbol,
-                    "Company": company,
-                    "LTP": ltp,
-                    "20EMA": round(ema20, 2),
-                    "50EMA": round(ema50, 2),
-                    "RSI14": round(rsi14, 2),
-                    "RS_Score": round(rs_score, 3) if show_rs and not np.isnan(rs_score) else "",
-                    "RS_Flag": rs_flag if show_rs else "",
-                    "EMA_Scan": ema_status,
-                    "RSI_Scan": rsi_status,
-                    "segment": segment,
-                    "token": token
-                })
+            record = _match(
+                symbol, company, segment, token, ltp, ema20, ema50, rsi14, rs_score, rs_flag, *match_args
+            )
+            if record is not None:
+                result.append((idx, record))
         except Exception:
             continue
-    return pd.DataFrame(result)
+    result.sort(key=lambda item: item[0])
+    return pd.DataFrame([record for _, record in result])
 
 def plot_candlestick(df):
-    df = df[df['Date'] <= pd.Timestamp.today()]
     fig = go.Figure(data=[go.Candlestick(
         x=df['Date'],
         open=df['Open'],
@@ -186,26 +274,47 @@ def show():
         return
 
     st.sidebar.title("Watchlist & Scan filters")
-    selected_watchlist = st.sidebar.selectbox("Select Watchlist CSV", WATCHLIST_FILES)
+    selected_watchlist = st.sidebar.selectbox("Select Watchlist CSV", WATCHLIST_FILES + [ALL_WATCHLISTS])
+    with st.sidebar.expander("Combine watchlists"):
+        combine_op = st.radio("Operation", list(COMBINE_OPS), horizontal=True)
+        combine_with = st.multiselect("With", [f for f in WATCHLIST_FILES if f != selected_watchlist])
 
     # Always load master.csv for Nifty 500 (for RS and chart)
     try:
-        master_for_nifty = load_watchlist("master.csv")
+        master_for_nifty = instruments.load()
     except Exception as e:
         st.error(f"Error loading master.csv for Nifty 500: {e}")
         return
 
     # Load selected watchlist for scanning
     try:
-        master_df = load_watchlist(selected_watchlist)
+        ids = watchlist_ids(selected_watchlist, combine_op, combine_with)
+        master_df = watchlists.frame(ids, master_for_nifty)
     except Exception as e:
         st.error(f"Error loading {selected_watchlist}: {e}")
         return
+    st.sidebar.caption(f"{len(master_df)} instruments")
+
+    with st.sidebar.expander("Prefetch history"):
+        st.caption("Download daily candles for master.csv and every watchlist so scans read them from disk. "
+                   "Runs in the background; `python prefetch.py` does the same from a shell.")
+        job = prefetch.background_status()
+        if job is None or not job["running"]:
+            if st.button("Prefetch all watchlists"):
+                job = prefetch.start_background(api_key, WATCHLIST_FILES)
+        if job is not None:
+            if job["running"]:
+                st.progress(job["done"] / max(job["total"], 1), text=f"{job['done']}/{job['total']} symbols")
+                st.button("Refresh progress")
+            elif job["error"]:
+                st.error(f"Prefetch failed: {job['error']}")
+            else:
+                st.write(job["summary"])
 
     ema_ltp_thr = st.sidebar.number_input("20EMA / LTP threshold", min_value=0.8, max_value=1.5, value=0.95, step=0.01)
     ema_ratio_thr = st.sidebar.number_input("50EMA / 20EMA threshold", min_value=0.8, max_value=1.5, value=0.95, step=0.01)
     updown_window = st.sidebar.number_input("Updays/Downdays Window (days)", min_value=5, max_value=40, value=15, step=1)
-    days = st.sidebar.number_input("Lookback Days", min_value=50, max_value=600, value=120, step=10)
+    bars = st.sidebar.number_input("Lookback Bars", min_value=50, max_value=400, value=80, step=10)
 
     st.sidebar.markdown("---")
     st.sidebar.subheader("RSI Scanner")
@@ -237,7 +346,7 @@ def show():
     nifty500_error = ""
     if nifty500_row is not None:
         nseg, ntok = nifty500_row['segment'], nifty500_row['token']
-        from_dt, to_dt = get_time_range(days)
+        from_dt, to_dt = trading_calendar.time_range_for_bars(bars)
         try:
             nifty_df = fetch_candles_definedge(nseg, ntok, "day", from_dt, to_dt, api_key)
             if nifty_df.empty:
@@ -250,7 +359,7 @@ def show():
     if st.button("Run Symbol Scan"):
         st.info("Scanning symbols, please wait...")
         scan_df = scan_symbols(
-            master_df, api_key, updown_window, days, ema_ltp_thr, ema_ratio_thr,
+            master_df, api_key, updown_window, bars, ema_ltp_thr, ema_ratio_thr,
             rsi_enabled, rsi_threshold, rsi_direction,
             ema_scan_enabled, ema_condition, show_rs,
             nifty_df=nifty_df
@@ -272,7 +381,7 @@ def show():
             symbol_sel = st.selectbox("See candlestick for symbol:", scan_df["Symbol"])
             row = scan_df[scan_df["Symbol"] == symbol_sel].iloc[0]
             segment, token = row["segment"], row["token"]
-            from_dt, to_dt = get_time_range(days)
+            from_dt, to_dt = trading_calendar.time_range_for_bars(bars)
             try:
                 df = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key)
                 st.subheader(f"{symbol_sel} Chart")
@@ -1,6 +1,7 @@
 import streamlit as st
-from utils import integrate_get, integrate_post
-import requests
+from utils import integrate_get, integrate_post, get_session_headers
+from transport import http_get, INTEGRATE_BASE_URL
+import response_cache
 
 def gtt_modify_form(order):
     unique_id = f"gtt_{order.get('alert_id', '')}"
@@ -81,9 +82,9 @@ def show():
                 st.rerun()
             if cols[9].button("Cancel", key=f"gtt_cancel_btn_{order.get('alert_id', '')}"):
                 api_session_key = st.secrets.get("integrate_api_session_key", "")
-                url = f"https://integrate.definedgesecurities.com/dart/v1/gttcancel/{order.get('alert_id', '')}"
+                url = f"{INTEGRATE_BASE_URL}/gttcancel/{order.get('alert_id', '')}"
                 headers = {"Authorization": api_session_key}
-                resp = requests.get(url, headers=headers)
+                resp = http_get(url, headers=headers)
                 try:
                     result = resp.json()
                 except Exception:
@@ -91,6 +92,7 @@ def show():
                 if result.get("status") == "ERROR":
                     st.error(f"Cancel Failed: {result.get('message','Error')}")
                 else:
+                    response_cache.invalidate_after(get_session_headers(), "/gttcancel")
                     st.success("Order cancelled!")
                 st.rerun()
             # Show modify form below THIS row if selected
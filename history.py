@@ -0,0 +1,262 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+import numpy as np
+import pandas as pd
+from transport import http_get, SDS_BASE_URL
+import candle_store
+import candle_validation
+import price_panel
+import resample
+import trading_calendar
+
+# Shared SDS history access for every page: fetch_candles_definedge() serves
+# bars from candle_store and tops it up from the broker (or, for 5m/15m/60m/
+# week/month, from the stored level below), parse_candles() turns the
+# broker's CSV into typed column arrays and candle_validation cleans them
+# once on the way into the store.
+
+TS_FORMAT = "%d%m%Y%H%M"
+CSV_COLUMNS = ("dateandtime",) + candle_store.COLUMNS + ("oi",)
+CSV_USECOLS = CSV_COLUMNS[:-1]
+CSV_DTYPES = {"dateandtime": np.int64, "open": np.float64, "high": np.float64, "low": np.float64,
+              "close": np.float64, "volume": np.float64}
+
+logger = logging.getLogger("integrate")
+
+_stats = {"reads": 0, "fetches": 0, "bars_fetched": 0, "bytes_fetched": 0, "stale_reads": 0, "slow_parses": 0, "panel_reads": 0, "resamples": 0}
+
+def to_minutes(value):
+    # "ddmmYYYYHHMM" / datetime -> minutes since epoch
+    if isinstance(value, str):
+        value = datetime.strptime(value, TS_FORMAT)
+    return int(np.datetime64(value, "m").astype(np.int64))
+
+def from_minutes(minutes):
+    return np.datetime64(int(minutes), "m").astype(datetime).strftime(TS_FORMAT)
+
+def decode_timestamps(stamps):
+    """ddmmYYYYHHMM read as int64 (leading zero dropped) -> (minutes since epoch, valid mask)"""
+    day = stamps // 10**10
+    month = stamps // 10**8 % 100
+    year = stamps // 10**4 % 10000
+    hour = stamps // 100 % 100
+    minute = stamps % 100
+    valid = (day >= 1) & (day <= 31) & (month >= 1) & (month <= 12) & (year >= 1970) & (hour < 24) & (minute < 60)
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]").astype(np.int64) + day - 1
+    # Day overflow (31 Feb) would roll into the next month
+    valid &= days < (months + 1).astype("datetime64[D]").astype(np.int64)
+    return days * 1440 + hour * 60 + minute, valid
+
+def _parse_tolerant(text):
+    # Handles blank, truncated or non-numeric fields the fast path rejects
+    df = pd.read_csv(io.StringIO(text), header=None, names=CSV_COLUMNS, usecols=CSV_USECOLS, dtype={"dateandtime": str})
+    df = df[df["dateandtime"].notnull()]
+    dates = pd.to_datetime(df["dateandtime"].str.strip(), format=TS_FORMAT, errors="coerce")
+    valid = dates.notna().values
+    data = {"ts": dates[valid].values.astype("datetime64[m]").astype(np.int64)}
+    for col in candle_store.COLUMNS:
+        data[col] = pd.to_numeric(df[col], errors="coerce").values[valid]
+    return candle_store.compact(data)
+
+def parse_candles(text):
+    """Broker CSV -> compact candle_store columns, sorted by ts"""
+    if not text.strip():
+        return candle_store.empty()
+    try:
+        # One C-parser pass, every column typed up front
+        df = pd.read_csv(io.StringIO(text), header=None, names=CSV_COLUMNS, usecols=CSV_USECOLS,
+                         dtype=CSV_DTYPES, engine="c")
+    except (ValueError, TypeError):
+        _stats["slow_parses"] += 1
+        data = _parse_tolerant(text)
+    else:
+        ts, valid = decode_timestamps(df["dateandtime"].to_numpy())
+        data = {"ts": ts[valid]}
+        for col in candle_store.COLUMNS:
+            data[col] = df[col].to_numpy()[valid]
+        data = candle_store.compact(data)
+    if len(data["ts"]) > 1 and not (np.diff(data["ts"]) > 0).all():
+        order = np.argsort(data["ts"], kind="stable")
+        data = {name: values[order] for name, values in data.items()}
+    return data
+
+def download(segment, token, timeframe, from_min, to_min, api_key):
+    url = f"{SDS_BASE_URL}/history/{segment}/{token}/{timeframe}/{from_minutes(from_min)}/{from_minutes(to_min)}"
+    resp = http_get(url, headers={"Authorization": api_key})
+    if resp.status_code != 200:
+        raise Exception(f"API error: {resp.status_code} {resp.text}")
+    data, report = candle_validation.validate(parse_candles(resp.text), timeframe, from_min, to_min)
+    candle_validation.record(segment, token, timeframe, report)
+    _stats["fetches"] += 1
+    _stats["bars_fetched"] += report["bars"]
+    _stats["bytes_fetched"] += len(resp.content)
+    return data
+
+def prices(values):
+    # float32 store prices -> float64 rounded back to the paise the broker sent
+    return np.round(values.astype(np.float64), 2)
+
+def to_frame(data):
+    return pd.DataFrame({
+        "Date": data["ts"].astype(np.int64).astype("datetime64[m]").astype("datetime64[ns]"),
+        "Open": prices(data["open"]),
+        "High": prices(data["high"]),
+        "Low": prices(data["low"]),
+        "Close": prices(data["close"]),
+        "Volume": data["volume"],
+    })
+
+def _load_base(segment, token, timeframe, from_min, to_min, api_key):
+    # Broker timeframes: top up the store with whatever is missing, then slice.
+    # Returns (bars, covered_from, covered_to) with the coverage the store
+    # really has, which stays short of the request after a failed top-up.
+    with candle_store.lock_for(segment, token, timeframe):
+        _stats["reads"] += 1
+        data, covered_from, covered_to = candle_store.load(segment, token, timeframe)
+        if data is None:
+            data, covered_from, covered_to = candle_store.empty(), from_min, from_min
+            missing = [(from_min, to_min)]
+        else:
+            missing = []
+            if from_min < covered_from:
+                missing.append((from_min, covered_from))
+            if to_min > covered_to:
+                # Refetch from the last stored bar, it may have been incomplete
+                start = int(data["ts"][-1]) if len(data["ts"]) else covered_to
+                missing.append((min(start, to_min), to_min))
+        try:
+            for lo, hi in missing:
+                data = candle_store.merge(data, download(segment, token, timeframe, lo, hi, api_key))
+        except Exception as e:
+            if not len(data["ts"]):
+                raise
+            # Serve what is on disk rather than failing the whole scan
+            logger.warning("candle top-up failed for %s/%s/%s: %s", segment, token, timeframe, e)
+            _stats["stale_reads"] += 1
+            return candle_store.slice_range(data, from_min, to_min), covered_from, covered_to
+        if missing:
+            covered_from, covered_to = min(from_min, covered_from), max(to_min, covered_to)
+            candle_store.save(segment, token, timeframe, data, covered_from, covered_to)
+        return candle_store.slice_range(data, from_min, to_min), covered_from, covered_to
+
+def _load_derived(segment, token, timeframe, from_min, to_min, api_key):
+    # Resampled timeframes: aggregate only the parent bars not rolled up yet
+    parent = resample.LEVELS[timeframe][0]
+    start = resample.bucket_start(from_min, timeframe)
+    with candle_store.lock_for(segment, token, timeframe):
+        data, covered_from, covered_to = candle_store.load(segment, token, timeframe)
+        if data is None:
+            data, covered_from, covered_to = candle_store.empty(), start, start
+            missing = [(start, to_min)]
+        else:
+            missing = []
+            if start < covered_from:
+                missing.append((start, int(data["ts"][0]) - 1 if len(data["ts"]) else covered_from))
+            if to_min > covered_to:
+                # Rebuild the last bucket, it may have been incomplete
+                last = int(data["ts"][-1]) if len(data["ts"]) else covered_to
+                missing.append((min(resample.bucket_start(last, timeframe), to_min), to_min))
+        new_from, new_to, complete = covered_from, covered_to, True
+        for lo, hi in missing:
+            bars, parent_from, parent_to = _load(segment, token, parent, lo, hi, api_key)
+            data = candle_store.merge(data, resample.aggregate(bars, timeframe))
+            if parent_from > lo:
+                # Older parent bars could not be fetched, the first bucket may be
+                # partial: serve it but store nothing, the next read retries
+                complete = False
+            # A stale parent only covers up to parent_to; the last bucket is
+            # rebuilt on the next read past new_to
+            new_from, new_to = min(new_from, lo), max(new_to, min(hi, parent_to))
+        if not complete:
+            return candle_store.slice_range(data, from_min, to_min), covered_from, covered_to
+        if missing:
+            _stats["resamples"] += 1
+            candle_store.save(segment, token, timeframe, data, new_from, new_to)
+        return candle_store.slice_range(data, from_min, to_min), new_from, new_to
+
+def _load(segment, token, timeframe, from_min, to_min, api_key):
+    if timeframe in resample.LEVELS:
+        return _load_derived(segment, token, timeframe, from_min, to_min, api_key)
+    return _load_base(segment, token, timeframe, from_min, to_min, api_key)
+
+def load_range(segment, token, timeframe, from_min, to_min, api_key):
+    """Stored bars for minute timestamps from_min..to_min as column arrays"""
+    return _load(segment, token, timeframe, from_min, to_min, api_key)[0]
+
+def fetch_candles_definedge(segment, token, timeframe, from_dt, to_dt, api_key):
+    """Bars between from_dt and to_dt ("ddmmYYYYHHMM"), fetching only what is not stored yet.
+
+    timeframe is an SDS timeframe ("day", "minute") or a derived one from
+    resample.LEVELS ("5m", "15m", "60m", "week", "month").
+    """
+    segment, token = str(segment), str(token)
+    from_min = to_minutes(from_dt)
+    to_min = min(to_minutes(to_dt), to_minutes(datetime.now()))
+    if timeframe == "day":
+        panel = price_panel.load()
+        row = panel.row(segment, token) if panel is not None else None
+        if row is not None and panel.covers(row, from_min, to_min):
+            _stats["panel_reads"] += 1
+            return panel.frame(row, from_min, to_min)
+    return to_frame(load_range(segment, token, timeframe, from_min, to_min, api_key))
+
+def fetch_last_bars(segment, token, timeframe, n, api_key):
+    """The last n bars, with the window sized by the trading calendar rather than calendar days"""
+    from_dt, to_dt = trading_calendar.time_range_for_bars(n, timeframe)
+    df = fetch_candles_definedge(segment, token, timeframe, from_dt, to_dt, api_key)
+    if 0 < len(df) < n and df["Date"].iloc[0] - datetime.strptime(from_dt, TS_FORMAT) < pd.Timedelta(days=4):
+        # Short although the series starts at the window edge (a holiday missing
+        # from the calendar, a partial session): widen once by the shortfall
+        from_dt, to_dt = trading_calendar.time_range_for_bars(2 * n - len(df), timeframe)
+        df = fetch_candles_definedge(segment, token, timeframe, from_dt, to_dt, api_key)
+    return df.tail(n).reset_index(drop=True)
+
+def _last_close_before(segment, token, from_min, to_min, api_key):
+    data = load_range(segment, token, "day", from_min, to_min, api_key)
+    return round(float(data["close"][-1]), 2) if len(data["ts"]) else None
+
+def previous_closes(instruments, api_key, workers=8):
+    """{(segment, token): close of the last daily bar before today} for a whole portfolio.
+
+    Read from the price panel / candle store; only instruments whose stored
+    bars stop short of the previous session's close trigger a small top-up fetch.
+    """
+    previous = trading_calendar.previous_trading_day(date.today())
+    # Stores and the panel are covered up to 15:30 of the day they were
+    # filled, so that is complete for the previous session
+    close_min = to_minutes(datetime.combine(previous, trading_calendar.MARKET_CLOSE))
+    from_min = to_minutes(datetime.combine(trading_calendar.sessions_back(5, previous), time(0, 0)))
+    keys = list(dict.fromkeys((str(segment), str(token)) for segment, token in instruments))
+    result = {}
+    pending = []
+    panel = price_panel.load()
+    rows = []
+    for key in keys:
+        row = panel.row(*key) if panel is not None else None
+        if row is not None and panel.covers(row, from_min, close_min):
+            rows.append((key, row))
+        else:
+            pending.append(key)
+    if rows:
+        hi = panel.columns(from_min, close_min).stop
+        closes = panel.close[[row for _, row in rows], :hi]
+        has_bar = ~np.isnan(closes)
+        last = hi - 1 - has_bar[:, ::-1].argmax(axis=1)
+        for i, (key, _) in enumerate(rows):
+            result[key] = round(float(closes[i, last[i]]), 2) if hi and has_bar[i].any() else None
+        _stats["panel_reads"] += len(rows)
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {key: pool.submit(_last_close_before, *key, from_min, close_min, api_key) for key in pending}
+        for key, future in futures.items():
+            try:
+                result[key] = future.result()
+            except Exception:
+                result[key] = None
+    return result
+
+def stats():
+    return dict(_stats)
@@ -1,64 +1,17 @@
 import streamlit as st
 import pandas as pd
-import requests
+from transport import http_get, INTEGRATE_BASE_URL
+from history import fetch_candles_definedge, previous_closes
+import instruments
+import date_axis
 from datetime import datetime, timedelta
 from utils import integrate_get
+from async_client import run_all, run_blocking
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import io
 import numpy as np
 
 # ========== Enhanced Chart Utils ==========
-@st.cache_data
-def load_master():
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    if df.shape[1] == 15:
-        df.columns = [
-            "segment", "token", "symbol", "symbol_series", "series", "unknown1",
-            "unknown2", "unknown3", "series2", "unknown4", "unknown5", "unknown6",
-            "isin", "unknown7", "company"
-        ]
-        return df[["segment", "token", "symbol", "symbol_series", "series"]]
-    else:  # legacy 14-column
-        df.columns = [
-            "segment", "token", "symbol", "instrument", "series", "isin1",
-            "facevalue", "lot", "something", "zero1", "two1", "one1", "isin", "one2"
-        ]
-        return df[["segment", "token", "symbol", "instrument", "series"]]
-
-def get_token(symbol, segment, master_df):
-    symbol = symbol.strip().upper()
-    segment = segment.strip().upper()
-    row = master_df[(master_df['symbol'].str.upper() == symbol) & (master_df['segment'].str.upper() == segment)]
-    if not row.empty:
-        return row.iloc[0]['token']
-    if "symbol_series" in master_df.columns:
-        row2 = master_df[(master_df['symbol_series'].str.upper() == symbol) & (master_df['segment'].str.upper() == segment)]
-        if not row2.empty:
-            return row2.iloc[0]['token']
-    if "instrument" in master_df.columns:
-        row3 = master_df[(master_df['instrument'].str.upper() == symbol) & (master_df['segment'].str.upper() == segment)]
-        if not row3.empty:
-            return row3.iloc[0]['token']
-    return None
-
-def fetch_candles_definedge(segment, token, from_dt, to_dt, api_key):
-    url = f"https://data.definedgesecurities.com/sds/history/{segment}/{token}/day/{from_dt}/{to_dt}"
-    headers = {"Authorization": api_key}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        raise Exception(f"API error: {resp.status_code} {resp.text}")
-    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
-    df = pd.read_csv(io.StringIO(resp.text), header=None, names=cols)
-    df = df[df["Dateandtime"].notnull()]
-    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
-    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
-    df = df.dropna(subset=["Date"])
-    df = df[df["Date"] <= pd.Timestamp.now()]
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
-
 def get_time_range(days, endtime="1530"):
     now = datetime.now()
     to = now.replace(hour=15, minute=30, second=0, microsecond=0)
@@ -86,16 +39,9 @@ def compute_macd(data, slow=26, fast=12, signal=9):
     return macd, signal_line
 
 def compute_relative_strength(stock_df, index_df):
-    merged = pd.merge(
-        stock_df[["Date", "Close"]],
-        index_df[["Date", "Close"]].rename(columns={"Close": "IndexClose"}),
-        on="Date",
-        how="inner"
-    ).dropna()
-    if len(merged) < 10:
+    rs_series = date_axis.relative_strength(stock_df, index_df)
+    if len(rs_series) < 10:
         return pd.Series(dtype="float64")
-    rs_series = merged["Close"] / merged["IndexClose"]
-    rs_series.index = merged["Date"]
     return rs_series
 
 def safe_float(val):
@@ -107,10 +53,10 @@ def safe_float(val):
 def get_ltp(exchange, token, api_session_key):
     if not exchange or not token:
         return 0.0
-    url = f"https://integrate.definedgesecurities.com/dart/v1/quotes/{exchange}/{token}"
+    url = f"{INTEGRATE_BASE_URL}/quotes/{exchange}/{token}"
     headers = {"Authorization": api_session_key}
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = http_get(url, headers=headers, timeout=5)
         if resp.status_code == 200:
             return safe_float(resp.json().get("ltp", 0))
         else:
@@ -118,32 +64,17 @@ def get_ltp(exchange, token, api_session_key):
     except Exception:
         return None
 
-def get_prev_close(exchange, token, api_session_key):
-    today = datetime.now()
-    for i in range(1, 5):
-        prev_day = today - timedelta(days=i)
-        if prev_day.weekday() < 5:
-            break
-    else:
-        prev_day = today - timedelta(days=1)
-    from_str = prev_day.strftime("%d%m%Y0000")
-    to_str = today.strftime("%d%m%Y1530")
-    url = f"https://data.definedgesecurities.com/sds/history/{exchange}/{token}/day/{from_str}/{to_str}"
-    headers = {"Authorization": api_session_key}
-    try:
-        resp = requests.get(url, headers=headers, timeout=5)
-        if resp.status_code == 200:
-            rows = resp.text.strip().split("\n")
-            if len(rows) >= 2:
-                prev_row = rows[-2]
-                prev_close = safe_float(prev_row.split(",")[4])
-                return prev_close
-            elif len(rows) == 1:
-                prev_close = safe_float(rows[0].split(",")[4])
-                return prev_close
-    except Exception:
-        pass
-    return 0.0
+async def get_ltp_async(exchange, token, api_session_key):
+    return await run_blocking(get_ltp, exchange, token, api_session_key)
+
+def fetch_quotes_concurrently(exch_tokens, api_session_key):
+    """LTP (concurrent quote calls) and previous close (candle store) for every (exchange, token)"""
+    ltps = run_all([get_ltp_async(exch, token, api_session_key) for exch, token in exch_tokens])
+    prev_closes = previous_closes(exch_tokens, api_session_key)
+    return {
+        (exch, token): (ltp, prev_closes.get((str(exch), str(token))))
+        for (exch, token), ltp in zip(exch_tokens, ltps)
+    }
 
 def highlight_pnl(val):
     try:
@@ -249,7 +180,7 @@ def show():
 
     api_session_key = st.secrets.get("integrate_api_session_key", "")
     auto_refresh = st.checkbox("Auto-refresh every 30 seconds", value=False)
-    master_df = load_master()
+    master = instruments.load()
 
     try:
         data = integrate_get("/holdings")
@@ -273,6 +204,7 @@ def show():
         total_invested = 0.0
         total_current = 0.0
         symbol_segment_dict = {}
+        parsed_holdings = []
         for h in active_holdings:
             ts = h.get("tradingsymbol")
             exch = h.get("exchange", "NSE")
@@ -289,9 +221,14 @@ def show():
                 token = h.get("token")
                 isin = h.get("isin", "")
                 qty = safe_float(h.get("dp_qty", 0))
+            parsed_holdings.append((h, tsym, exch, token, isin, qty))
+        quotes = fetch_quotes_concurrently(
+            list(dict.fromkeys((exch, token) for _, _, exch, token, _, _ in parsed_holdings if token)),
+            api_session_key
+        )
+        for h, tsym, exch, token, isin, qty in parsed_holdings:
             avg_buy = safe_float(h.get("avg_buy_price", 0))
-            ltp = get_ltp(exch, token, api_session_key) if token else None
-            prev_close = get_prev_close(exch, token, api_session_key) if token else None
+            ltp, prev_close = quotes.get((exch, token), (None, None))
             invested = avg_buy * qty if avg_buy is not None else 0.0
             current = ltp * qty if ltp is not None else 0.0
             today_pnl = (ltp - prev_close) * qty if (ltp is not None and prev_close) else 0.0
@@ -386,7 +323,7 @@ def show():
             with col1:
                 selected_symbol = st.selectbox("Select Holding", sorted(holding_symbols))
                 segment = symbol_segment_dict[selected_symbol]
-                token = get_token(selected_symbol, segment, master_df)
+                token = master.token(selected_symbol, segment)
                 st.subheader("Technical Settings")
                 show_ema = st.checkbox("Moving Averages", value=True)
                 show_rsi = st.checkbox("RSI Indicator", value=True)
@@ -403,21 +340,16 @@ def show():
                 index_row = None
                 index_symbol = None
                 index_series = "IDX"
-                for idx, row in master_df.iterrows():
-                    sym = row["symbol"].strip().lower()
-                    if (rs_index_option == "Nifty 500" and sym == "nifty 500") or \
-                       (rs_index_option == "Nifty 50" and sym == "nifty 50"):
-                        index_row = row
-                        index_symbol = row["symbol"]
-                        if "series" in row and pd.notnull(row["series"]):
-                            index_series = row["series"]
-                        break
+                row = master.find(rs_index_option, "NSE")
+                if row is not None:
+                    index_row = master.record(row)
+                    index_symbol = index_row["symbol"]
+                    index_series = index_row["series"] or index_series
 
                 if token:
                     from_dt, to_dt = get_time_range(days_back)
                     try:
-                        chart_df = fetch_candles_definedge(segment, token, from_dt, to_dt, api_key=api_session_key)
-                        chart_df = chart_df.sort_values("Date")
+                        chart_df = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key=api_session_key)
                         if show_ema:
                             chart_df['EMA20'] = chart_df['Close'].ewm(span=20, adjust=False).mean()
                             chart_df['EMA50'] = chart_df['Close'].ewm(span=50, adjust=False).mean()
@@ -433,7 +365,7 @@ def show():
                             index_token = index_row["token"]
                             index_segment = index_row["segment"]
                             try:
-                                index_df = fetch_candles_definedge(index_segment, index_token, from_dt, to_dt, api_key=api_session_key)
+                                index_df = fetch_candles_definedge(index_segment, index_token, "day", from_dt, to_dt, api_key=api_session_key)
                             except Exception as e:
                                 st.warning(f"Error fetching {rs_index_option} candles: {e}")
                                 index_df = None
@@ -1,53 +1,15 @@
 import streamlit as st
 import pandas as pd
-import requests
+from transport import http_get, INTEGRATE_BASE_URL
+from history import fetch_candles_definedge, previous_closes
+import instruments
 from datetime import datetime, timedelta
 from utils import integrate_get
 import plotly.express as px
 import plotly.graph_objs as go
-import io
 
 # ========== Chart Utils (from your code) ==========
 
-@st.cache_data
-def load_master():
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    df.columns = [
-        "segment", "token", "symbol", "instrument", "series", "isin1",
-        "facevalue", "lot", "something", "zero1", "two1", "one1", "isin", "one2"
-    ]
-    return df[["segment", "token", "symbol", "instrument"]]
-
-def get_token(symbol, segment, master_df):
-    symbol = symbol.strip().upper()
-    segment = segment.strip().upper()
-    row = master_df[(master_df['symbol'] == symbol) & (master_df['segment'] == segment)]
-    if not row.empty:
-        return row.iloc[0]['token']
-    row2 = master_df[(master_df['instrument'] == symbol) & (master_df['segment'] == segment)]
-    if not row2.empty:
-        return row2.iloc[0]['token']
-    return None
-
-def fetch_candles_definedge(segment, token, from_dt, to_dt, api_key):
-    url = f"https://data.definedgesecurities.com/sds/history/{segment}/{token}/day/{from_dt}/{to_dt}"
-    headers = {"Authorization": api_key}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        raise Exception(f"API error: {resp.status_code} {resp.text}")
-    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
-    df = pd.read_csv(io.StringIO(resp.text), header=None, names=cols)
-    df = df[df["Dateandtime"].notnull()]
-    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
-    # Parse date, only keep rows with valid dates
-    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
-    df = df.dropna(subset=["Date"])
-    # Only keep dates up to today (no future dates!)
-    df = df[df["Date"] <= pd.Timestamp.now()]
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
-
 def get_time_range(days, endtime="1530"):
     now = datetime.now()
     to = now.replace(hour=15, minute=30, second=0, microsecond=0)
@@ -67,10 +29,10 @@ def safe_float(val):
 def get_ltp(exchange, token, api_session_key):
     if not exchange or not token:
         return 0.0
-    url = f"https://integrate.definedgesecurities.com/dart/v1/quotes/{exchange}/{token}"
+    url = f"{INTEGRATE_BASE_URL}/quotes/{exchange}/{token}"
     headers = {"Authorization": api_session_key}
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = http_get(url, headers=headers, timeout=5)
         if resp.status_code == 200:
             return safe_float(resp.json().get("ltp", 0))
         else:
@@ -78,33 +40,6 @@ def get_ltp(exchange, token, api_session_key):
     except Exception:
         return None
 
-def get_prev_close(exchange, token, api_session_key):
-    today = datetime.now()
-    for i in range(1, 5):
-        prev_day = today - timedelta(days=i)
-        if prev_day.weekday() < 5:
-            break
-    else:
-        prev_day = today - timedelta(days=1)
-    from_str = prev_day.strftime("%d%m%Y0000")
-    to_str = today.strftime("%d%m%Y1530")
-    url = f"https://data.definedgesecurities.com/sds/history/{exchange}/{token}/day/{from_str}/{to_str}"
-    headers = {"Authorization": api_session_key}
-    try:
-        resp = requests.get(url, headers=headers, timeout=5)
-        if resp.status_code == 200:
-            rows = resp.text.strip().split("\n")
-            if len(rows) >= 2:
-                prev_row = rows[-2]
-                prev_close = safe_float(prev_row.split(",")[4])
-                return prev_close
-            elif len(rows) == 1:
-                prev_close = safe_float(rows[0].split(",")[4])
-                return prev_close
-    except Exception:
-        pass
-    return 0.0
-
 def highlight_pnl(val):
     try:
         val = float(val)
@@ -123,7 +58,7 @@ def show():
     auto_refresh = st.checkbox("Auto-refresh every 30 seconds", value=False)
 
     # Load master for chart lookup
-    master_df = load_master()
+    master = instruments.load()
 
     try:
         data = integrate_get("/holdings")
@@ -152,6 +87,18 @@ def show():
 
         symbol_segment_dict = {}
 
+        # Previous closes for the whole portfolio come from the candle store in one go
+        held = []
+        for h in active_holdings:
+            ts = h.get("tradingsymbol")
+            if isinstance(ts, list) and len(ts) > 0 and isinstance(ts[0], dict):
+                exch, token = ts[0].get("exchange", h.get("exchange", "NSE")), ts[0].get("token")
+            else:
+                exch, token = h.get("exchange", "NSE"), h.get("token")
+            if token:
+                held.append((exch, token))
+        prev_closes = previous_closes(held, api_session_key)
+
         for h in active_holdings:
             ts = h.get("tradingsymbol")
             exch = h.get("exchange", "NSE")
@@ -171,7 +118,7 @@ def show():
 
             avg_buy = safe_float(h.get("avg_buy_price", 0))
             ltp = get_ltp(exch, token, api_session_key) if token else None
-            prev_close = get_prev_close(exch, token, api_session_key) if token else None
+            prev_close = prev_closes.get((str(exch), str(token))) if token else None
 
             invested = avg_buy * qty if avg_buy is not None else 0.0
             current = ltp * qty if ltp is not None else 0.0
@@ -258,14 +205,13 @@ def show():
         if holding_symbols:
             selected_symbol = st.selectbox("Select Holding Symbol for Chart", sorted(holding_symbols))
             segment = symbol_segment_dict[selected_symbol]
-            token = get_token(selected_symbol, segment, master_df)
+            token = master.token(selected_symbol, segment)
             if token:
                 show_ema20 = st.checkbox("Show 20 EMA", value=True, key="ema20_chart")
                 show_ema50 = st.checkbox("Show 50 EMA", value=True, key="ema50_chart")
                 from_dt, to_dt = get_time_range(120)
                 try:
-                    chart_df = fetch_candles_definedge(segment, token, from_dt, to_dt, api_key=api_session_key)
-                    chart_df = chart_df.sort_values("Date")
+                    chart_df = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key=api_session_key)
                     chart_df = chart_df.tail(60).copy()
                     if show_ema20:
                         chart_df['EMA20'] = chart_df['Close'].ewm(span=20, adjust=False).mean()
@@ -1,12 +1,13 @@
 import streamlit as st
 import pandas as pd
-import requests
+from transport import http_get, INTEGRATE_BASE_URL
+from history import fetch_candles_definedge, previous_closes
+import instruments
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-import io
 from utils import integrate_get
 
 def is_number(val):
@@ -15,46 +16,13 @@ def is_number(val):
     except Exception:
         return False
 
-@st.cache_data
-def load_master():
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    if df.shape[1] == 15:
-        df.columns = [
-            "segment", "token", "symbol", "symbol_series", "series", "unknown1",
-            "unknown2", "unknown3", "series2", "unknown4", "unknown5", "unknown6",
-            "isin", "unknown7", "company"
-        ]
-        return df[["segment", "token", "symbol", "symbol_series", "series"]]
-    else:
-        df.columns = [
-            "segment", "token", "symbol", "instrument", "series", "isin1",
-            "facevalue", "lot", "something", "zero1", "two1", "one1", "isin", "one2"
-        ]
-        return df[["segment", "token", "symbol", "instrument", "series"]]
-
-def get_token(symbol, segment, master_df):
-    symbol = str(symbol).strip().upper()
-    segment = str(segment).strip().upper()
-    row = master_df[(master_df['symbol'].str.upper() == symbol) & (master_df['segment'].str.upper() == segment)]
-    if not row.empty:
-        return row.iloc[0]['token']
-    if "symbol_series" in master_df.columns:
-        row2 = master_df[(master_df['symbol_series'].str.upper() == symbol) & (master_df['segment'].str.upper() == segment)]
-        if not row2.empty:
-            return row2.iloc[0]['token']
-    if "instrument" in master_df.columns:
-        row3 = master_df[(master_df['instrument'].str.upper() == symbol) & (master_df['segment'].str.upper() == segment)]
-        if not row3.empty:
-            return row3.iloc[0]['token']
-    return None
-
 def get_ltp(exchange, token, api_session_key):
     if not exchange or not token:
         return None
-    url = f"https://integrate.definedgesecurities.com/dart/v1/quotes/{exchange}/{token}"
+    url = f"{INTEGRATE_BASE_URL}/quotes/{exchange}/{token}"
     headers = {"Authorization": api_session_key}
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = http_get(url, headers=headers, timeout=5)
         if resp.status_code == 200:
             ltp = resp.json().get("ltp", None)
             try:
@@ -65,56 +33,6 @@ def get_ltp(exchange, token, api_session_key):
         pass
     return None
 
-def get_prev_close(exchange, token, api_session_key):
-    today = datetime.now()
-    for i in range(1, 5):
-        prev_day = today - timedelta(days=i)
-        if prev_day.weekday() < 5:
-            break
-    else:
-        prev_day = today - timedelta(days=1)
-    from_str = prev_day.strftime("%d%m%Y0000")
-    to_str = today.strftime("%d%m%Y%H%M")
-    url = f"https://data.definedgesecurities.com/sds/history/{exchange}/{token}/day/{from_str}/{to_str}"
-    headers = {"Authorization": api_session_key}
-    try:
-        resp = requests.get(url, headers=headers, timeout=5)
-        if resp.status_code == 200:
-            rows = resp.text.strip().split("\n")
-            if len(rows) >= 2:
-                prev_row = rows[-2]
-                try:
-                    prev_close = float(prev_row.split(",")[4])
-                    return prev_close
-                except Exception:
-                    return None
-            elif len(rows) == 1:
-                try:
-                    prev_close = float(rows[0].split(",")[4])
-                    return prev_close
-                except Exception:
-                    return None
-    except Exception:
-        pass
-    return None
-
-def fetch_candles_definedge(segment, token, from_dt, to_dt, api_key):
-    url = f"https://data.definedgesecurities.com/sds/history/{segment}/{token}/day/{from_dt}/{to_dt}"
-    headers = {"Authorization": api_key}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        raise Exception(f"API error: {resp.status_code} {resp.text}")
-    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
-    df = pd.read_csv(io.StringIO(resp.text), header=None, names=cols)
-    df = df[df["Dateandtime"].notnull()]
-    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
-    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
-    df = df.dropna(subset=["Date"])
-    df = df[df["Date"] <= pd.Timestamp.now()]
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
-
 def get_time_range(days, endtime="1530"):
     now = datetime.now()
     to = now.replace(hour=15, minute=30, second=0, microsecond=0)
@@ -247,43 +165,55 @@ def minervini_high_vs_ema20_interpretation(high, ema20):
         interp = "✅ Healthy: High is within reasonable range of 20 EMA"
     return diff_pct_rounded, interp
 
+def holding_instrument(h):
+    """(tradingsymbol, exchange, segment) of a holding record"""
+    ts = h.get("tradingsymbol")
+    if isinstance(ts, list):
+        if ts:
+            if isinstance(ts[0], dict):
+                tsym = ts[0].get("tradingsymbol", "N/A")
+                exch = ts[0].get("exchange", h.get("exchange", "NSE"))
+                segment = ts[0].get("segment", exch)
+            else:
+                tsym = str(ts[0])
+                exch = h.get("exchange", "NSE")
+                segment = exch
+        else:
+            tsym = "N/A"
+            exch = h.get("exchange", "NSE")
+            segment = exch
+    elif isinstance(ts, dict):
+        tsym = ts.get("tradingsymbol", "N/A")
+        exch = ts.get("exchange", h.get("exchange", "NSE"))
+        segment = ts.get("segment", exch)
+    else:
+        tsym = str(ts) if ts is not None else "N/A"
+        exch = h.get("exchange", "NSE")
+        segment = exch
+    return tsym, exch, segment
+
 def show():
     st.title("Holdings Details Dashboard")
 
     api_session_key = st.secrets.get("integrate_api_session_key", "")
-    master_df = load_master()
+    master = instruments.load()
     data = integrate_get("/holdings")
     holdings = data.get("data", [])
     if not holdings:
         st.warning("No holdings found.")
         return
 
-    rows = []
-    for h in holdings:
-        ts = h.get("tradingsymbol")
-        if isinstance(ts, list):
-            if ts:
-                if isinstance(ts[0], dict):
-                    tsym = ts[0].get("tradingsymbol", "N/A")
-                    exch = ts[0].get("exchange", h.get("exchange", "NSE"))
-                    segment = ts[0].get("segment", exch)
-                else:
-                    tsym = str(ts[0])
-                    exch = h.get("exchange", "NSE")
-                    segment = exch
-            else:
-                tsym = "N/A"
-                exch = h.get("exchange", "NSE")
-                segment = exch
-        elif isinstance(ts, dict):
-            tsym = ts.get("tradingsymbol", "N/A")
-            exch = ts.get("exchange", h.get("exchange", "NSE"))
-            segment = ts.get("segment", exch)
-        else:
-            tsym = str(ts) if ts is not None else "N/A"
-            exch = h.get("exchange", "NSE")
-            segment = exch
+    # Previous closes for every holding come from the candle store in one go
+    instruments_held = [holding_instrument(h) for h in holdings]
+    held = []
+    for tsym, exch, segment in instruments_held:
+        token = master.token(tsym, segment)
+        if token:
+            held.append((exch, token))
+    prev_closes = previous_closes(held, api_session_key)
 
+    rows = []
+    for h, (tsym, exch, segment) in zip(holdings, instruments_held):
         isin = h.get("isin", "")
         product = h.get("product", "")
         try:
@@ -296,10 +226,10 @@ def show():
             entry = 0.0
         invested = entry * qty
 
-        token = get_token(tsym, segment, master_df)
+        token = master.token(tsym, segment)
         ltp = get_ltp(exch, token, api_session_key) if token else None
         if not (is_number(ltp) and ltp > 0):
-            ltp = get_prev_close(exch, token, api_session_key) if token else None
+            ltp = prev_closes.get((str(exch), str(token))) if token else None
 
         if is_number(ltp) and ltp > 0:
             current_value = ltp * qty
@@ -439,7 +369,7 @@ def show():
     if len(holding_symbols):
         selected_symbol = st.selectbox("Select Holding for Chart", sorted(holding_symbols))
         segment = df[df["Symbol"] == selected_symbol]["Exchange"].values[0] if not df[df["Symbol"] == selected_symbol].empty else "NSE"
-        token = get_token(selected_symbol, segment, master_df)
+        token = master.token(selected_symbol, segment)
         show_ema = st.checkbox("Show EMAs", value=True)
         show_rsi = st.checkbox("Show RSI", value=True)
         show_macd = st.checkbox("Show MACD", value=True)
@@ -447,9 +377,7 @@ def show():
         if token:
             from_dt, to_dt = get_time_range(days_back)
             try:
-                chart_df = fetch_candles_definedge(segment, token, from_dt, to_dt, api_key=api_session_key)
-                chart_df = chart_df.sort_values("Date")
-                chart_df = chart_df[chart_df["Date"] <= pd.Timestamp.now()]
+                chart_df = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key=api_session_key)
                 chart_df['EMA20'] = chart_df['Close'].ewm(span=20, adjust=False).mean()
                 if show_ema:
                     chart_df['EMA50'] = chart_df['Close'].ewm(span=50, adjust=False).mean()
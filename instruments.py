@@ -0,0 +1,213 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import snapshot
+
+# The instrument master (master.csv), parsed once per process and shared by
+# every page and session. Token resolution goes through dict indexes built
+# on first use instead of scanning the frame with str.upper() per call:
+#
+#   (SEGMENT, SYMBOL)           first row for the symbol
+#   (SEGMENT, SYMBOL_SERIES)    e.g. ("NSE", "SBIN-EQ"), or the index name
+#   (SEGMENT, SYMBOL, SERIES)
+#   ISIN
+#   (SEGMENT, token)
+#
+# Keys are upper-cased.
+#
+# The master is shared by reference, never copied per session or rerun, so it
+# is guarded against writes: .frame is a copy-on-write view (a page that
+# modifies it gets its own copy of the touched columns), and column arrays,
+# segment rows, tick sizes and lot sizes are read-only numpy arrays.
+
+MASTER_FILE = "master.csv"
+
+COLUMNS = [
+    "segment", "token", "symbol", "symbol_series", "series", "unknown1",
+    "ticksize", "lotsize", "series2", "unknown4", "precision", "unknown6",
+    "isin", "unknown7", "company"
+]
+# Older 14-column masters: no company, "instrument" in the symbol_series slot
+LEGACY_COLUMNS = [
+    "segment", "token", "symbol", "symbol_series", "series", "isin1",
+    "facevalue", "lotsize", "something", "zero1", "two1", "one1", "isin", "one2"
+]
+FIELDS = [
+    "segment", "token", "symbol", "symbol_series", "series", "isin", "company",
+    "ticksize", "lotsize", "precision"
+]
+
+# pandas 3 always copies on write; earlier versions only with the option set
+COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+def _view(df):
+    # Zero-copy under copy-on-write; a private copy otherwise
+    return df.copy(deep=not COPY_ON_WRITE)
+
+def _read_only(array):
+    array = np.asarray(array)
+    array.flags.writeable = False
+    return array
+
+class Master:
+    def __init__(self, df):
+        self._frame = df
+        self._tokens = df["token"].tolist()
+        self._symbols = df["symbol"].tolist()
+        self._keys = {}
+        self._indexes = {}
+        self._segments = {}
+        self._columns = {}
+
+    @property
+    def frame(self):
+        return _view(self._frame)
+
+    def column(self, col):
+        """Read-only numpy array of one column"""
+        values = self._columns.get(col)
+        if values is None:
+            values = self._columns[col] = _read_only(self._frame[col].to_numpy(dtype=object))
+        return values
+
+    @property
+    def tick_sizes(self):
+        """Read-only float array of price ticks in rupees (NaN when unknown)"""
+        ticks = self._columns.get("tick_sizes")
+        if ticks is None:
+            paise = pd.to_numeric(pd.Series(self.column("ticksize")), errors="coerce").to_numpy()
+            digits = pd.to_numeric(pd.Series(self.column("precision")), errors="coerce").fillna(2).to_numpy()
+            ticks = self._columns["tick_sizes"] = _read_only(paise / 10 ** digits)
+        return ticks
+
+    @property
+    def lot_sizes(self):
+        """Read-only int array of lot sizes (1 when unknown)"""
+        lots = self._columns.get("lot_sizes")
+        if lots is None:
+            lots = pd.to_numeric(pd.Series(self.column("lotsize")), errors="coerce").fillna(1)
+            lots = self._columns["lot_sizes"] = _read_only(lots.to_numpy(dtype=np.int64))
+        return lots
+
+    def _column_keys(self, col):
+        keys = self._keys.get(col)
+        if keys is None:
+            keys = self._keys[col] = [str(value).strip().upper() for value in self._frame[col].tolist()]
+        return keys
+
+    def _index(self, *cols):
+        # Built on first use, so a page that only needs one kind of lookup pays for one
+        index = self._indexes.get(cols)
+        if index is None:
+            index = self._indexes[cols] = _index(*[self._column_keys(col) for col in cols])
+        return index
+
+    @property
+    def by_symbol(self):
+        return self._index("segment", "symbol")
+
+    @property
+    def by_symbol_series(self):
+        return self._index("segment", "symbol_series")
+
+    @property
+    def by_series(self):
+        return self._index("segment", "symbol", "series")
+
+    @property
+    def by_token(self):
+        return self._index("segment", "token")
+
+    @property
+    def by_isin(self):
+        return self._index("isin")
+
+    def __len__(self):
+        return len(self._frame)
+
+    def find(self, symbol, segment, series=None):
+        """Row position of symbol (or symbol_series) on segment, or None"""
+        key = (str(segment).strip().upper(), str(symbol).strip().upper())
+        if series:
+            row = self.by_series.get(key + (str(series).strip().upper(),))
+            if row is not None:
+                return row
+        row = self.by_symbol.get(key)
+        return row if row is not None else self.by_symbol_series.get(key)
+
+    def token(self, symbol, segment, series=None):
+        row = self.find(symbol, segment, series)
+        return self._tokens[row] if row is not None else None
+
+    def tick_size(self, symbol, segment, series=None):
+        row = self.find(symbol, segment, series)
+        tick = self.tick_sizes[row] if row is not None else np.nan
+        return None if np.isnan(tick) else float(tick)
+
+    def lot_size(self, symbol, segment, series=None):
+        row = self.find(symbol, segment, series)
+        return int(self.lot_sizes[row]) if row is not None else None
+
+    def record(self, row):
+        """Fields of one row as a plain dict (the caller's own, free to modify)"""
+        return {col: self.column(col)[row] for col in FIELDS}
+
+    def find_isin(self, isin):
+        isin = str(isin).strip().upper()
+        # Indices carry "----" in the ISIN column
+        return self.by_isin.get(isin) if len(isin) == 12 else None
+
+    def symbol_for_token(self, segment, token):
+        row = self.by_token.get((str(segment).strip().upper(), str(token).strip().upper()))
+        return self._symbols[row] if row is not None else None
+
+    def segments(self):
+        return sorted(self._frame["segment"].unique())
+
+    def segment(self, segment):
+        """Read-only int32 array of the rows of one segment (computed once per segment)"""
+        segment = str(segment).strip().upper()
+        rows = self._segments.get(segment)
+        if rows is None:
+            rows = self._segments[segment] = _read_only(
+                np.flatnonzero(self._frame["segment"].to_numpy() == segment).astype(np.int32))
+        return rows
+
+    def tradable(self):
+        """Read-only int32 rows of NSE/BSE cash instruments in the EQ and BE series, by symbol and series"""
+        rows = self._segments.get("tradable")
+        if rows is None:
+            df = self._frame.reset_index(drop=True)
+            df = df[df["series"].isin(["EQ", "BE"]) & df["segment"].isin(["NSE", "BSE"])]
+            order = df.sort_values(["symbol", "series"]).index.to_numpy()
+            rows = self._segments["tradable"] = _read_only(order.astype(np.int32))
+        return rows
+
+def _index(*keys):
+    # Key -> row position; the first row wins, as iloc[0] did
+    keys = keys[0] if len(keys) == 1 else list(zip(*keys))
+    return dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+
+def parse(path=MASTER_FILE):
+    df = pd.read_csv(path, sep="\t", header=None, dtype=str, keep_default_na=False)
+    df.columns = (COLUMNS if df.shape[1] == 15 else LEGACY_COLUMNS)[:df.shape[1]]
+    for col in FIELDS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[FIELDS].reset_index(drop=True)
+    df["segment"] = df["segment"].str.strip().str.upper()
+    return df
+
+_master = None
+_master_mtime = None
+_master_lock = threading.Lock()
+
+def load(path=MASTER_FILE):
+    """The shared Master, rebuilt only when the file changes (from its snapshot if possible)"""
+    global _master, _master_mtime
+    mtime = os.stat(path).st_mtime
+    with _master_lock:
+        if _master is None or mtime != _master_mtime:
+            _master, _master_mtime = Master(snapshot.load(path, parse, FIELDS)), mtime
+        return _master
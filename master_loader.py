@@ -1,6 +1,11 @@
 import pandas as pd
+import snapshot
 
 def load_watchlist(filename):
+    """segment/token/symbol/series/company frame for a watchlist (or master) file"""
+    return snapshot.load(filename, parse_watchlist)
+
+def parse_watchlist(filename):
     # Read the file, ignore blank lines
     with open(filename, "r", encoding="utf-8") as f:
         lines = [line for line in f if line.strip()]
@@ -0,0 +1,404 @@
+"""Local stand-in for the Integrate REST API and the SDS history service.
+
+    python mock_broker.py --port 8700 --holdings 40
+    INTEGRATE_BASE_URL=http://127.0.0.1:8700/dart/v1 SDS_BASE_URL=http://127.0.0.1:8700/sds streamlit run app.py
+
+Every instrument in master.csv gets a deterministic synthetic daily price
+history (the same token always yields the same candles), so scans, charts
+and order pages can be load-tested without the broker.
+"""
+import argparse
+import csv
+import functools
+import itertools
+import json
+import re
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+import numpy as np
+
+HISTORY_START = date(2015, 1, 1)
+HISTORY_END = date(2035, 12, 31)   # fixed so generated prices never shift
+MARKET_OPEN_MINUTE = 9 * 60 + 15
+MINUTES_PER_SESSION = 375
+
+def load_instruments(path="master.csv"):
+    by_token = {}
+    by_tradingsymbol = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t"):
+            if len(row) < 5:
+                continue
+            inst = {
+                "segment": row[0], "token": row[1], "symbol": row[2], "symbol_series": row[3],
+                "series": row[4], "isin": row[12] if len(row) > 12 else "",
+                "company": row[14] if len(row) > 14 else row[2],
+            }
+            by_token.setdefault((inst["segment"], inst["token"]), inst)
+            by_tradingsymbol.setdefault((inst["segment"], inst["symbol_series"]), inst)
+    return by_token, by_tradingsymbol
+
+def _seed(token):
+    return int(token) if str(token).isdigit() else zlib.crc32(str(token).encode("utf-8"))
+
+@functools.lru_cache(maxsize=256)
+def _all_weekdays():
+    days = np.arange(np.datetime64(HISTORY_START), np.datetime64(HISTORY_END) + 1, dtype="datetime64[D]")
+    return days[np.is_busday(days)]
+
+@functools.lru_cache(maxsize=256)
+def daily_series(token):
+    """(days, open, high, low, close, volume) for every weekday HISTORY_START..HISTORY_END"""
+    days = _all_weekdays()
+    n = len(days)
+    seed = _seed(token)
+    rng = np.random.default_rng(seed)
+    base = 20.0 + seed % 3000
+    close = base * np.exp(np.cumsum(rng.normal(0.0003, 0.018, n)))
+    open_ = close * (1 + rng.normal(0, 0.006, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.008, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.008, n)))
+    volume = rng.integers(10_000, 2_000_000, n)
+    return days, open_.round(2), high.round(2), low.round(2), close.round(2), volume
+
+def _parse_ts(value):
+    return datetime.strptime(value, "%d%m%Y%H%M")
+
+def day_candles_csv(token, from_dt, to_dt, now=None):
+    now = now or datetime.now()
+    to_dt = min(to_dt, now)
+    days, o, h, l, c, v = daily_series(token)
+    lo = np.searchsorted(days, np.datetime64(from_dt.date()))
+    hi = np.searchsorted(days, np.datetime64(to_dt.date()), side="right")
+    lines = []
+    for i in range(lo, hi):
+        stamp = days[i].astype(date).strftime("%d%m%Y") + "0000"
+        lines.append(f"{stamp},{o[i]},{h[i]},{l[i]},{c[i]},{v[i]},0")
+    return "\n".join(lines) + ("\n" if lines else "")
+
+def minute_candles_csv(token, from_dt, to_dt, now=None):
+    now = now or datetime.now()
+    to_dt = min(to_dt, now)
+    days, o, h, l, c, v = daily_series(token)
+    lo = np.searchsorted(days, np.datetime64(from_dt.date()))
+    hi = np.searchsorted(days, np.datetime64(to_dt.date()), side="right")
+    lines = []
+    for i in range(lo, hi):
+        day = days[i].astype(date)
+        rng = np.random.default_rng([_seed(token), i])
+        # Random walk from the day's open pinned to its close
+        steps = rng.normal(0, 1, MINUTES_PER_SESSION).cumsum()
+        steps -= np.linspace(0, steps[-1], MINUTES_PER_SESSION)
+        path = np.linspace(o[i], c[i], MINUTES_PER_SESSION) + steps * (h[i] - l[i]) / 40
+        path = np.clip(path, l[i], h[i])
+        vols = rng.multinomial(int(v[i]), np.full(MINUTES_PER_SESSION, 1 / MINUTES_PER_SESSION))
+        start = datetime(day.year, day.month, day.day) + timedelta(minutes=MARKET_OPEN_MINUTE)
+        prev = o[i]
+        for m in range(MINUTES_PER_SESSION):
+            ts = start + timedelta(minutes=m)
+            if ts < from_dt or ts > to_dt:
+                prev = path[m]
+                continue
+            bar_open, bar_close = prev, path[m]
+            lines.append(
+                f"{ts.strftime('%d%m%Y%H%M')},{bar_open:.2f},{max(bar_open, bar_close):.2f},"
+                f"{min(bar_open, bar_close):.2f},{bar_close:.2f},{vols[m]},0"
+            )
+            prev = bar_close
+    return "\n".join(lines) + ("\n" if lines else "")
+
+def last_close(token, today=None):
+    days, o, h, l, c, v = daily_series(token)
+    idx = np.searchsorted(days, np.datetime64(today or date.today()), side="right") - 1
+    return float(c[max(idx, 0)]), float(c[max(idx - 1, 0)])
+
+class MockBroker:
+    def __init__(self, master_path="master.csv", n_holdings=40, n_open_orders=10):
+        self.by_token, self.by_tradingsymbol = load_instruments(master_path)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(250000001)
+        equities = sorted(
+            (inst for inst in self.by_token.values() if inst["segment"] == "NSE" and inst["series"] == "EQ"),
+            key=lambda inst: int(inst["token"]) if inst["token"].isdigit() else 0,
+        )
+        rng = np.random.default_rng(7)
+        picks = [equities[i] for i in rng.choice(len(equities), size=min(n_holdings, len(equities)), replace=False)]
+        self.holdings = [self._holding(inst, rng) for inst in picks]
+        self.orders = [self._order(inst, rng) for inst in picks[:n_open_orders]]
+        self.gtt_orders = [self._gtt(inst, rng) for inst in picks[:max(1, n_open_orders // 2)]]
+        self.trades = []
+
+    def _instrument(self, exchange, key):
+        return self.by_token.get((exchange, key)) or self.by_tradingsymbol.get((exchange, key))
+
+    def _holding(self, inst, rng):
+        ltp, _ = last_close(inst["token"])
+        return {
+            "dp_qty": str(int(rng.integers(1, 500))),
+            "t1_qty": "0",
+            "avg_buy_price": f"{ltp * rng.uniform(0.7, 1.2):.2f}",
+            "haircut": "0.125",
+            "tradingsymbol": [{
+                "exchange": "NSE", "tradingsymbol": inst["symbol_series"], "token": inst["token"],
+                "isin": inst["isin"], "ticksize": "0.05",
+            }],
+        }
+
+    def _order(self, inst, rng):
+        ltp, _ = last_close(inst["token"])
+        return {
+            "order_id": str(next(self.ids)), "tradingsymbol": inst["symbol_series"], "exchange": "NSE",
+            "order_type": "BUY", "quantity": str(int(rng.integers(1, 100))), "price_type": "LIMIT",
+            "price": f"{ltp * 0.97:.2f}", "trigger_price": "0", "product_type": "CNC",
+            "order_status": "OPEN", "validity": "DAY",
+        }
+
+    def _gtt(self, inst, rng):
+        ltp, _ = last_close(inst["token"])
+        return {
+            "alert_id": str(next(self.ids)), "tradingsymbol": inst["symbol_series"], "exchange": "NSE",
+            "order_type": "SELL", "condition": "LTP_BELOW", "alert_price": f"{ltp * 0.95:.2f}",
+            "price": f"{ltp * 0.95:.2f}", "quantity": str(int(rng.integers(1, 100))),
+            "product_type": "CNC", "remarks": "mock",
+        }
+
+    def quote(self, exchange, key):
+        inst = self._instrument(exchange, key)
+        if inst is None:
+            return 404, {"status": "ERROR", "message": f"Unknown instrument {exchange}/{key}"}
+        ltp, prev = last_close(inst["token"])
+        return 200, {
+            "status": "SUCCESS", "exchange": exchange, "token": inst["token"],
+            "tradingsymbol": inst["symbol_series"], "company_name": inst["company"],
+            "instrument_name": inst["series"], "isin": inst["isin"], "ltp": f"{ltp:.2f}",
+            "day_open": f"{prev:.2f}", "lotsize": "1", "ticksize": "0.05", "price_precision": "2",
+            "upper_circuit": f"{prev * 1.2:.2f}", "lower_circuit": f"{prev * 0.8:.2f}",
+        }
+
+    def security_info(self, exchange, key):
+        status, data = self.quote(exchange, key)
+        if status == 200:
+            data.update({"freeze_qty": "100000", "deliveryMargin": "20", "varMargin": "12.5", "elmMargin": "3.5",
+                         "issueDate": "", "listingDate": ""})
+        return status, data
+
+    def positions(self):
+        rows = []
+        for h in self.holdings[:5]:
+            ts = h["tradingsymbol"][0]
+            ltp, _ = last_close(ts["token"])
+            avg = float(h["avg_buy_price"])
+            rows.append({
+                "tradingsymbol": ts["tradingsymbol"], "exchange": "NSE", "product_type": "INTRADAY",
+                "net_quantity": "10", "net_averageprice": f"{avg:.2f}", "lastPrice": f"{ltp:.2f}",
+                "day_buy_avg": f"{avg:.2f}", "total_buy_avg": f"{avg:.2f}",
+                "unrealized_pnl": f"{(ltp - avg) * 10:.2f}", "realized_pnl": "0",
+            })
+        return rows
+
+    def place_order(self, payload):
+        order = {
+            "order_id": str(next(self.ids)), "tradingsymbol": payload.get("tradingsymbol", ""),
+            "exchange": payload.get("exchange", "NSE"), "order_type": payload.get("order_type", "BUY"),
+            "quantity": str(payload.get("quantity", "1")), "price_type": payload.get("price_type", "LIMIT"),
+            "price": str(payload.get("price", "0")), "trigger_price": str(payload.get("trigger_price", "0")),
+            "product_type": payload.get("product_type", "CNC"), "order_status": "OPEN",
+            "validity": payload.get("validity", "DAY"),
+        }
+        with self.lock:
+            self.orders.append(order)
+        return 200, {"status": "SUCCESS", "order_id": order["order_id"], "message": "Order placed"}
+
+    def modify_order(self, payload):
+        with self.lock:
+            for order in self.orders:
+                if order["order_id"] == payload.get("order_id"):
+                    order.update({k: str(v) for k, v in payload.items() if k in order})
+                    return 200, {"status": "SUCCESS", "order_id": order["order_id"], "message": "Order modified"}
+        return 200, {"status": "ERROR", "message": "Order not found"}
+
+    def cancel_order(self, order_id):
+        with self.lock:
+            for order in self.orders:
+                if order["order_id"] == order_id and order["order_status"] == "OPEN":
+                    order["order_status"] = "CANCELED"
+                    return 200, {"status": "SUCCESS", "order_id": order_id, "message": "Order cancelled"}
+        return 200, {"status": "ERROR", "message": "Order not found"}
+
+    def place_gtt(self, payload):
+        gtt = {
+            "alert_id": str(next(self.ids)), "tradingsymbol": payload.get("tradingsymbol", ""),
+            "exchange": payload.get("exchange", "NSE"), "order_type": payload.get("order_type", "SELL"),
+            "condition": payload.get("condition", "LMT_OCO"),
+            "alert_price": str(payload.get("alert_price", payload.get("stoploss_price", "0"))),
+            "price": str(payload.get("price", payload.get("target_price", "0"))),
+            "quantity": str(payload.get("quantity", payload.get("target_quantity", "1"))),
+            "product_type": payload.get("product_type", "CNC"), "remarks": payload.get("remarks", ""),
+        }
+        with self.lock:
+            self.gtt_orders.append(gtt)
+        return 200, {"status": "SUCCESS", "alert_id": gtt["alert_id"], "message": "GTT placed"}
+
+    def modify_gtt(self, payload):
+        with self.lock:
+            for gtt in self.gtt_orders:
+                if gtt["alert_id"] == payload.get("alert_id"):
+                    gtt.update({k: str(v) for k, v in payload.items() if k in gtt})
+                    return 200, {"status": "SUCCESS", "alert_id": gtt["alert_id"], "message": "GTT modified"}
+        return 200, {"status": "ERROR", "message": "GTT order not found"}
+
+    def cancel_gtt(self, alert_id):
+        with self.lock:
+            before = len(self.gtt_orders)
+            self.gtt_orders = [g for g in self.gtt_orders if g["alert_id"] != alert_id]
+            if len(self.gtt_orders) < before:
+                return 200, {"status": "SUCCESS", "alert_id": alert_id, "message": "GTT cancelled"}
+        return 200, {"status": "ERROR", "message": "GTT order not found"}
+
+    def margin(self, payload):
+        total = 0.0
+        for item in payload.get("basketlists", []):
+            try:
+                total += float(item.get("price") or 0) * float(item.get("quantity") or 0)
+            except (TypeError, ValueError):
+                pass
+        return 200, {"status": "SUCCESS", "marginUsed": f"{total:.2f}", "marginUsedAfterTrade": f"{total:.2f}"}
+
+    def history(self, segment, token, timeframe, from_str, to_str):
+        try:
+            from_dt, to_dt = _parse_ts(from_str), _parse_ts(to_str)
+        except ValueError:
+            return 400, "text/plain", "Invalid date range"
+        if (segment, token) not in self.by_token:
+            return 404, "text/plain", "Unknown token"
+        if timeframe == "day":
+            return 200, "text/csv", day_candles_csv(token, from_dt, to_dt)
+        if timeframe == "minute":
+            return 200, "text/csv", minute_candles_csv(token, from_dt, to_dt)
+        return 400, "text/plain", f"Unsupported timeframe {timeframe}"
+
+    def handle(self, method, path, payload):
+        """-> (status, content_type, body)"""
+        path = unquote(path.split("?", 1)[0])
+        m = re.fullmatch(r"/sds/history/([^/]+)/([^/]+)/([^/]+)/(\d{12})/(\d{12})", path)
+        if m and method == "GET":
+            return self.history(*m.groups())
+        if not path.startswith("/dart/v1/"):
+            return 404, "application/json", json.dumps({"status": "ERROR", "message": "Not found"})
+        route = path[len("/dart/v1"):]
+        status, data = self._route(method, route, payload)
+        return status, "application/json", json.dumps(data)
+
+    def _route(self, method, route, payload):
+        with self.lock:
+            orders, gtts, trades = list(self.orders), list(self.gtt_orders), list(self.trades)
+        if method == "GET":
+            if route == "/holdings":
+                return 200, {"status": "SUCCESS", "data": self.holdings}
+            if route == "/positions":
+                return 200, {"status": "SUCCESS", "positions": self.positions()}
+            if route == "/orders":
+                return 200, {"status": "SUCCESS", "orders": orders}
+            if route == "/trades":
+                return 200, {"status": "SUCCESS", "trades": trades}
+            if route == "/gttorders":
+                return 200, {"status": "SUCCESS", "pendingGTTOrderBook": gtts}
+            if route == "/limits":
+                return 200, {"status": "SUCCESS", "cash": "1200000.00", "marginUsed": "0.00", "payin": "0.00"}
+            m = re.fullmatch(r"/quotes/([^/]+)/([^/]+)", route)
+            if m:
+                return self.quote(*m.groups())
+            m = re.fullmatch(r"/securityinfo/([^/]+)/([^/]+)", route)
+            if m:
+                return self.security_info(*m.groups())
+            m = re.fullmatch(r"/cancel/([^/]+)", route)
+            if m:
+                return self.cancel_order(m.group(1))
+            m = re.fullmatch(r"/gttcancel/([^/]+)", route)
+            if m:
+                return self.cancel_gtt(m.group(1))
+        elif method == "POST":
+            if route == "/placeorder":
+                return self.place_order(payload)
+            if route == "/modify":
+                return self.modify_order(payload)
+            if route in ("/gttplaceorder", "/ocoplaceorder"):
+                return self.place_gtt(payload)
+            if route == "/gttmodify":
+                return self.modify_gtt(payload)
+            if route == "/margin":
+                return self.margin(payload)
+            if route == "/positions/convert":
+                return 200, {"status": "SUCCESS", "message": "Product converted"}
+        return 404, {"status": "ERROR", "message": f"Unknown endpoint {method} {route}"}
+
+class MockBrokerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real broker
+
+    def _respond(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = {}
+        if length:
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                payload = {}
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        status, content_type, body = self.server.broker.handle(method, self.path, payload)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def start_mock_server(host="127.0.0.1", port=0, latency_ms=0, verbose=False, **broker_kwargs):
+    """Start the mock in a background thread; returns (server, integrate_base_url, sds_base_url)"""
+    server = ThreadingHTTPServer((host, port), MockBrokerHandler)
+    server.daemon_threads = True
+    server.broker = MockBroker(**broker_kwargs)
+    server.latency_ms = latency_ms
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://{host}:{server.server_address[1]}"
+    return server, f"{base}/dart/v1", f"{base}/sds"
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Integrate + SDS history server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--master", default="master.csv")
+    parser.add_argument("--holdings", type=int, default=40)
+    parser.add_argument("--open-orders", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server, integrate_url, sds_url = start_mock_server(
+        args.host, args.port, args.latency_ms, args.verbose,
+        master_path=args.master, n_holdings=args.holdings, n_open_orders=args.open_orders,
+    )
+    print(f"export INTEGRATE_BASE_URL={integrate_url}")
+    print(f"export SDS_BASE_URL={sds_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,35 @@
 import streamlit as st
-from utils import integrate_get, integrate_post
-import requests
+from utils import integrate_get, integrate_post, get_session_headers
+from transport import http_get, INTEGRATE_BASE_URL
+from async_client import run_all, run_blocking
+import response_cache
 
 def norm_status(s):
     return str(s).replace(" ", "_").upper()
 
-def cancel_order(order_id):
-    api_session_key = st.secrets.get("integrate_api_session_key", "")
-    url = f"https://integrate.definedgesecurities.com/dart/v1/cancel/{order_id}"
+def cancel_order(order_id, session_headers=None, api_session_key=None):
+    """Cancel one order; pass session_headers/api_session_key when not on the script thread"""
+    if session_headers is None:
+        session_headers = get_session_headers()
+    if api_session_key is None:
+        api_session_key = st.secrets.get("integrate_api_session_key", "")
+    url = f"{INTEGRATE_BASE_URL}/cancel/{order_id}"
     headers = {"Authorization": api_session_key}
-    resp = requests.get(url, headers=headers)
+    resp = http_get(url, headers=headers)
     try:
         result = resp.json()
     except Exception:
         result = {"status": "ERROR", "message": "Invalid API response"}
+    if result.get("status") != "ERROR":
+        response_cache.invalidate_after(session_headers, f"/cancel/{order_id}")
     return result
 
 @st.cache_data(show_spinner=False)
 def get_ltp(tradingsymbol, exchange, api_session_key):
     try:
-        url = f"https://integrate.definedgesecurities.com/dart/v1/quotes/{exchange}/{tradingsymbol}"
+        url = f"{INTEGRATE_BASE_URL}/quotes/{exchange}/{tradingsymbol}"
         headers = {"Authorization": api_session_key}
-        resp = requests.get(url, headers=headers, timeout=2)
+        resp = http_get(url, headers=headers, timeout=2)
         if resp.status_code == 200:
             ltp_val = resp.json().get("ltp", None)
             return float(ltp_val) if ltp_val is not None else "N/A"
@@ -29,6 +37,21 @@ def get_ltp(tradingsymbol, exchange, api_session_key):
         pass
     return "N/A"
 
+async def cancel_order_async(order_id):
+    # Read here, on the script thread: the worker running cancel_order has no
+    # ScriptRunContext and would see an empty session_state
+    headers = get_session_headers()
+    api_session_key = st.secrets.get("integrate_api_session_key", "")
+    return await run_blocking(cancel_order, order_id, headers, api_session_key)
+
+async def get_ltp_async(tradingsymbol, exchange, api_session_key):
+    return await run_blocking(get_ltp, tradingsymbol, exchange, api_session_key)
+
+def cancel_orders(order_ids):
+    """Cancel several orders concurrently, returns {order_id: result}"""
+    results = run_all(cancel_order_async(oid) for oid in order_ids)
+    return dict(zip(order_ids, results))
+
 def show():
     st.header("Orders Book & Manage")
 
@@ -70,17 +93,14 @@ def show():
         if not selected_ids:
             st.warning("No orders selected.")
         else:
-            for oid in selected_ids:
-                result = cancel_order(oid)
+            for oid, result in cancel_orders(selected_ids).items():
                 if result.get("status") == "ERROR":
                     st.error(f"Cancel Failed [{oid}]: {result.get('message','Error')}")
                 else:
                     st.success(f"Order {oid} cancelled!")
             st.rerun()
     if col4.button("Cancel All"):
-        for order in open_orders:
-            oid = order["order_id"]
-            result = cancel_order(oid)
+        for oid, result in cancel_orders([order["order_id"] for order in open_orders]).items():
             if result.get("status") == "ERROR":
                 st.error(f"Cancel Failed [{oid}]: {result.get('message','Error')}")
             else:
@@ -173,6 +193,10 @@ def show():
                     return
             return  # Only show form, not table
 
+    # Fetch LTPs for all rows concurrently before rendering the table
+    ltp_keys = list(dict.fromkeys((o.get("tradingsymbol", ""), o.get("exchange", "")) for o in open_orders))
+    ltps = dict(zip(ltp_keys, run_all(get_ltp_async(ts, ex, api_session_key) for ts, ex in ltp_keys)))
+
     # Table header
     columns = st.columns(col_widths)
     for i, label in enumerate(col_labels):
@@ -189,7 +213,7 @@ def show():
             if key == "ltp":
                 tradingsymbol = order.get("tradingsymbol", "")
                 exchange = order.get("exchange", "")
-                ltp_val = get_ltp(tradingsymbol, exchange, api_session_key)
+                ltp_val = ltps.get((tradingsymbol, exchange), "N/A")
                 columns[i+1].write(ltp_val)
             else:
                 value = order.get(key, "N/A")
@@ -1,37 +1,14 @@
 import streamlit as st
 from utils import integrate_post
-import requests
-import pandas as pd
-
-@st.cache_data
-def load_master_symbols():
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    # Handles both 14 and 15 column master files
-    if df.shape[1] == 15:
-        df.columns = [
-            "segment", "token", "symbol", "symbol_series", "series", "unknown1",
-            "unknown2", "unknown3", "series2", "unknown4", "unknown5", "unknown6",
-            "isin", "unknown7", "company"
-        ]
-        df = df[["symbol", "series", "segment"]]
-    else:
-        df.columns = [
-            "segment", "token", "symbol", "instrument", "series", "isin1",
-            "facevalue", "lot", "something", "zero1", "two1", "one1", "isin", "one2"
-        ]
-        df = df[["symbol", "series", "segment"]]
-    # Only EQ & BE series, and only NSE/BSE stocks (not derivatives, indices)
-    df = df[df["series"].isin(["EQ", "BE"])]
-    df = df[df["segment"].isin(["NSE", "BSE"])]
-    df = df.drop_duplicates(subset=["symbol", "series", "segment"])
-    df["tradingsymbol"] = df["symbol"] + "-" + df["series"]
-    return df.sort_values("tradingsymbol")
+from transport import http_get, INTEGRATE_BASE_URL
+import instruments
+import symbol_search
 
 def get_ltp(tradingsymbol, exchange, api_session_key):
     try:
-        url = f"https://integrate.definedgesecurities.com/dart/v1/quotes/{exchange}/{tradingsymbol}"
+        url = f"{INTEGRATE_BASE_URL}/quotes/{exchange}/{tradingsymbol}"
         headers = {"Authorization": api_session_key}
-        resp = requests.get(url, headers=headers, timeout=3)
+        resp = http_get(url, headers=headers, timeout=3)
         if resp.status_code == 200:
             return float(resp.json().get("ltp", 0))
     except Exception:
@@ -63,18 +40,17 @@ def show():
     st.header("Order Place", divider="rainbow")
 
     # Load symbols for dropdown (EQ/BE)
-    master_df = load_master_symbols()
-    symbol_list = master_df["tradingsymbol"].unique().tolist()
-    symbol_default = "RELIANCE-EQ" if "RELIANCE-EQ" in symbol_list else symbol_list[0] if symbol_list else ""
+    master = instruments.load()
 
     col1, col2, col3, col4 = st.columns([2,2,2,2], gap="large")
 
     with col1:
-        tradingsymbol = st.selectbox("Symbol", symbol_list, index=symbol_list.index(symbol_default) if symbol_default in symbol_list else 0, key="ts")
-        # Find the row in master_df corresponding to the selected trading symbol
-        selected_row = master_df[master_df["tradingsymbol"] == tradingsymbol].iloc[0]
-        exchange_options = [selected_row["segment"]]
-        exchange = st.selectbox("Exch", exchange_options, index=0, key="exch")
+        row = symbol_search.picker("Symbol", master, key="ts", default="RELIANCE", within=master.tradable())
+        # EQ/BE symbol_series is the broker's trading symbol, e.g. "RELIANCE-EQ"
+        tradingsymbol = master.record(row)["symbol_series"] if row is not None else ""
+        exchange_options = [seg for seg in ("NSE", "BSE") if master.find(tradingsymbol, seg) is not None]
+        # Not rendered without a symbol, so it comes back on index 0 instead of a stale None
+        exchange = st.selectbox("Exch", exchange_options, index=0, key="exch") if exchange_options else None
         price_type = st.selectbox("Type", ["LIMIT", "MARKET", "SL-LIMIT", "SL-MARKET"], key="pt")
     with col2:
         validity = st.selectbox("Validity", ["DAY", "IOC", "EOS"], key="val")
@@ -130,7 +106,8 @@ def show():
         )
         st.markdown('</div>', unsafe_allow_html=True)
 
-    if st.button("Place Order", use_container_width=True, type="primary"):
+    # Nothing to place until a symbol is picked
+    if st.button("Place Order", use_container_width=True, type="primary", disabled=row is None) and row is not None and exchange:
         # --- FIX: Set price_type & trigger_price logic for correct order ---
         data = {
             "tradingsymbol": tradingsymbol,
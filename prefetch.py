@@ -0,0 +1,160 @@
+"""Warm the candle store for every instrument in master.csv and the watchlists.
+
+    python prefetch.py --bars 400 --workers 8
+
+Run it after 15:30 so the first interactive scan of the day reads bars from
+disk instead of downloading them. Progress is checkpointed, an interrupted
+run picks up where it stopped.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import candle_store
+import price_panel
+import trading_calendar
+from history import fetch_candles_definedge
+import watchlists
+
+DEFAULT_BARS = 400      # longest lookback the scanner offers
+DEFAULT_WORKERS = 8     # the history lane of rate_limiter still caps request rate
+CHECKPOINT_EVERY = 50
+
+def checkpoint_path():
+    return os.path.join(candle_store.STORE_DIR, "prefetch_checkpoint.json")
+
+def collect_instruments(files):
+    """Unique (segment, token) pairs across the given watchlist files, in file order"""
+    ids = watchlists.union(*[watchlists.load(f) for f in files if os.path.exists(f)])
+    df = watchlists.frame(ids)
+    return {
+        (str(segment), str(token).strip()): symbol
+        for segment, token, symbol in zip(df["segment"], df["token"], df["symbol"])
+        if segment and token
+    }
+
+def _load_checkpoint(to_dt, bars):
+    try:
+        with open(checkpoint_path(), "r") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return set()
+    # Only resume a run for the same trading day and lookback
+    if data.get("to_dt", "")[:8] != to_dt[:8] or data.get("bars") != bars:
+        return set()
+    return set(data.get("done", []))
+
+def _save_checkpoint(to_dt, bars, done, failed):
+    path = checkpoint_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"to_dt": to_dt, "bars": bars, "done": sorted(done), "failed": failed}, f)
+    os.replace(tmp, path)
+
+def warm(api_key, files, bars=DEFAULT_BARS, workers=DEFAULT_WORKERS, resume=True, progress=None):
+    """Fetch daily candles for every instrument in `files`.
+
+    progress(done, total) is called on the calling thread after each symbol.
+    """
+    from_dt, to_dt = trading_calendar.time_range_for_bars(bars)
+    instruments = collect_instruments(files)
+    done = _load_checkpoint(to_dt, bars) if resume else set()
+    pending = [key for key in instruments if f"{key[0]}:{key[1]}" not in done]
+    failed = {}
+    started = time.perf_counter()
+    total = len(instruments)
+    if progress:
+        progress(total - len(pending), total)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_candles_definedge, segment, token, "day", from_dt, to_dt, api_key): (segment, token)
+            for segment, token in pending
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            segment, token = futures[future]
+            name = f"{segment}:{token}"
+            try:
+                future.result()
+                done.add(name)
+            except Exception as e:
+                failed[name] = str(e)
+            if i % CHECKPOINT_EVERY == 0:
+                _save_checkpoint(to_dt, bars, done, failed)
+            if progress:
+                progress(total - len(pending) + i, total)
+    _save_checkpoint(to_dt, bars, done, failed)
+    if pending or price_panel.load() is None:
+        price_panel.build()
+    return {
+        "instruments": total,
+        "fetched": len(pending) - len(failed),
+        "skipped": total - len(pending),
+        "failed": len(failed),
+        "errors": dict(list(failed.items())[:10]),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+# One background warm-up per process, shared by every session: the scanner
+# sidebar starts it and polls it, a rerun or a second session never starts
+# another or abandons the running one
+_job = None
+_job_lock = threading.Lock()
+
+def start_background(api_key, files, bars=DEFAULT_BARS, workers=DEFAULT_WORKERS):
+    """Run warm() on a daemon thread unless one is running; returns the job status"""
+    global _job
+    with _job_lock:
+        if _job is not None and _job["running"]:
+            return dict(_job)
+        job = _job = {"running": True, "done": 0, "total": 0, "summary": None, "error": None,
+                      "started": time.time()}
+
+    def progress(done, total):
+        job["done"], job["total"] = done, total
+
+    def run():
+        try:
+            job["summary"] = warm(api_key, files, bars, workers, progress=progress)
+        except Exception as e:
+            job["error"] = str(e)
+        finally:
+            job["running"] = False
+
+    threading.Thread(target=run, name="prefetch", daemon=True).start()
+    return dict(job)
+
+def background_status():
+    """Status of the last background warm-up, or None if none was started"""
+    with _job_lock:
+        return dict(_job) if _job is not None else None
+
+def _api_key():
+    key = os.environ.get("INTEGRATE_API_SESSION_KEY", "")
+    if not key and os.path.exists("session.json"):
+        with open("session.json", "r") as f:
+            key = json.load(f).get("api_session_key", "")
+    return key
+
+def main():
+    from definedge_batch_scan import WATCHLIST_FILES
+    parser = argparse.ArgumentParser(description="Prefetch daily candles into the candle store")
+    parser.add_argument("--bars", type=int, default=DEFAULT_BARS)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an earlier run")
+    parser.add_argument("--api-key", default=None, help="defaults to INTEGRATE_API_SESSION_KEY or session.json")
+    parser.add_argument("files", nargs="*", help=f"watchlist files (default: {', '.join(WATCHLIST_FILES)})")
+    args = parser.parse_args()
+
+    def report(done, total):
+        if done % 100 == 0 or done == total:
+            print(f"{done}/{total}", flush=True)
+
+    summary = warm(args.api_key or _api_key(), args.files or WATCHLIST_FILES, args.bars, args.workers,
+                   resume=not args.restart, progress=report)
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Tokens x trading dates price panel built from the candle store.
+
+    python price_panel.py --days 600
+
+Each field (open/high/low/close/volume) is one float32 .npy matrix with a row
+per instrument and a column per trading date, NaN where the instrument has
+no bar. Readers memory-map the files, so every Streamlit session and the
+scanner share the same pages and a symbol's history is a row slice.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import candle_store
+
+FIELDS = ("open", "high", "low", "close", "volume")
+PANEL_DAYS = 600
+
+def panel_dir():
+    return os.path.join(candle_store.STORE_DIR, "panel")
+
+def _stored_tokens(timeframe="day"):
+    keys = []
+    if not os.path.isdir(candle_store.STORE_DIR):
+        return keys
+    for segment in sorted(os.listdir(candle_store.STORE_DIR)):
+        folder = os.path.join(candle_store.STORE_DIR, segment, timeframe)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".npz"):
+                keys.append((segment, name[:-4]))
+    return keys
+
+def build(days=PANEL_DAYS, timeframe="day"):
+    """Rebuild the panel from every stored instrument; returns its shape"""
+    start_day = (np.datetime64(datetime.now() - timedelta(days=days), "D")).astype(np.int64)
+    series = {}
+    for segment, token in _stored_tokens(timeframe):
+        data, covered_from, covered_to = candle_store.load(segment, token, timeframe, cache=False)
+        if data is None:
+            continue
+        series[(segment, token)] = (data, covered_from, covered_to)
+
+    day_sets = [np.unique(d["ts"] // 1440) for d, _, _ in series.values()]
+    dates = np.unique(np.concatenate(day_sets)).astype(np.int64) if day_sets else np.empty(0, dtype=np.int64)
+    dates = dates[dates >= start_day]
+    keys = list(series)
+
+    tmp = panel_dir() + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    shape = (len(keys), len(dates))
+    matrices = {
+        field: np.lib.format.open_memmap(os.path.join(tmp, f"{field}.npy"), mode="w+", dtype=np.float32, shape=shape)
+        for field in FIELDS
+    }
+    covered = np.zeros((len(keys), 2), dtype=np.int64)
+    time_of_day = np.zeros(len(keys), dtype=np.int16)
+    for row, key in enumerate(keys):
+        data, covered_from, covered_to = series[key]
+        days_of = data["ts"] // 1440
+        keep = days_of >= start_day
+        cols = np.searchsorted(dates, days_of[keep])
+        for field in FIELDS:
+            line = np.full(len(dates), np.nan, dtype=np.float32)
+            line[cols] = data[field][keep]
+            matrices[field][row] = line
+        covered[row] = (max(covered_from, int(start_day) * 1440), covered_to)
+        if len(data["ts"]):
+            time_of_day[row] = data["ts"][-1] % 1440
+    for matrix in matrices.values():
+        matrix.flush()
+    del matrices
+    np.save(os.path.join(tmp, "dates.npy"), dates)
+    np.save(os.path.join(tmp, "covered.npy"), covered)
+    np.save(os.path.join(tmp, "time_of_day.npy"), time_of_day)
+    with open(os.path.join(tmp, "panel.json"), "w") as f:
+        json.dump({"timeframe": timeframe, "built_at": time.time(), "keys": [f"{s}:{t}" for s, t in keys]}, f)
+
+    # Swap directories; sessions holding the old maps keep reading the old files
+    old = panel_dir() + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.isdir(panel_dir()):
+        os.replace(panel_dir(), old)
+    os.replace(tmp, panel_dir())
+    shutil.rmtree(old, ignore_errors=True)
+    return shape
+
+class Panel:
+    def __init__(self, directory):
+        with open(os.path.join(directory, "panel.json"), "r") as f:
+            manifest = json.load(f)
+        self.built_at = manifest["built_at"]
+        self.keys = [tuple(k.split(":", 1)) for k in manifest["keys"]]
+        self.index = {key: row for row, key in enumerate(self.keys)}
+        self.days = np.load(os.path.join(directory, "dates.npy"))
+        self.covered = np.load(os.path.join(directory, "covered.npy"))
+        self.time_of_day = np.load(os.path.join(directory, "time_of_day.npy"))
+        for field in FIELDS:
+            setattr(self, field, np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r"))
+
+    @property
+    def dates(self):
+        return self.days.astype("datetime64[D]")
+
+    def row(self, segment, token):
+        return self.index.get((str(segment), str(token)))
+
+    def covers(self, row, from_min, to_min):
+        return self.covered[row, 0] <= from_min and self.covered[row, 1] >= to_min
+
+    def columns(self, from_min, to_min):
+        """Column slice of the trading dates between two minute timestamps"""
+        lo = np.searchsorted(self.days, from_min // 1440)
+        hi = np.searchsorted(self.days, to_min // 1440, side="right")
+        return slice(lo, hi)
+
+    def frame(self, row, from_min, to_min):
+        """One instrument as the usual Date/Open/.../Volume DataFrame"""
+        cols = self.columns(from_min, to_min)
+        close = self.close[row, cols]
+        has_bar = ~np.isnan(close)
+        ts = self.days[cols][has_bar] * 1440 + int(self.time_of_day[row])
+        keep = (ts >= from_min) & (ts <= to_min)
+        df = pd.DataFrame({"Date": ts[keep].astype("datetime64[m]").astype("datetime64[ns]")})
+        for field in FIELDS:
+            values = getattr(self, field)[row, cols][has_bar][keep]
+            df[field.capitalize()] = values.astype(np.int64) if field == "volume" else np.round(values.astype(np.float64), 2)
+        return df
+
+_panel = None
+_panel_mtime = None
+_panel_lock = threading.Lock()
+
+def load():
+    """The current panel (reloaded when rebuilt), or None if none has been built"""
+    global _panel, _panel_mtime
+    manifest = os.path.join(panel_dir(), "panel.json")
+    try:
+        mtime = os.stat(manifest).st_mtime
+    except OSError:
+        return None
+    with _panel_lock:
+        if _panel is None or mtime != _panel_mtime:
+            try:
+                _panel, _panel_mtime = Panel(panel_dir()), mtime
+            except (OSError, ValueError, KeyError):
+                return None
+        return _panel
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the price panel from the candle store")
+    parser.add_argument("--days", type=int, default=PANEL_DAYS)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    shape = build(args.days)
+    print(json.dumps({"tokens": shape[0], "dates": shape[1], "seconds": round(time.perf_counter() - started, 1)}))
+
+if __name__ == "__main__":
+    main()
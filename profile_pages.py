@@ -0,0 +1,73 @@
+"""Render dashboard pages headless and time them, e.g. against a cassette:
+
+    INTEGRATE_CASSETTE_MODE=record python profile_pages.py holdings orders
+    INTEGRATE_CASSETTE_MODE=replay INTEGRATE_CASSETTE_LATENCY_MS=20-80 \
+        python profile_pages.py holdings definedge_batch_scan --click "Run Symbol Scan" --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from streamlit.testing.v1 import AppTest
+import response_cache
+import tracing
+import cassette
+
+PAGE_SCRIPT = "import {module}\n{module}.show()\n"
+
+def load_session():
+    # Recording needs real credentials; replay works with placeholders
+    if os.path.exists("session.json"):
+        with open("session.json", "r") as f:
+            return json.load(f)
+    return {"uid": "offline", "actid": "offline", "api_session_key": "offline", "ws_session_key": "", "created_at": time.time()}
+
+def render(module, session, click=None, timeout=600):
+    at = AppTest.from_string(PAGE_SCRIPT.format(module=module), default_timeout=timeout)
+    at.secrets["integrate_api_session_key"] = session["api_session_key"]
+    at.session_state["integrate_session"] = session
+    started = time.perf_counter()
+    at.run()
+    if click:
+        for button in at.button:
+            if button.label == click:
+                button.click().run()
+                break
+    elapsed = time.perf_counter() - started
+    return elapsed, [str(e.value) for e in at.exception]
+
+def profile_page(module, runs=3, click=None, warm=False):
+    session = load_session()
+    timings = []
+    errors = []
+    tracing.clear()
+    for _ in range(runs):
+        if not warm:
+            response_cache.clear()
+        elapsed, errors = render(module, session, click)
+        timings.append(elapsed)
+    calls = len(tracing.recent_spans())
+    return {
+        "page": module,
+        "runs": runs,
+        "min_s": round(min(timings), 3),
+        "median_s": round(statistics.median(timings), 3),
+        "max_s": round(max(timings), 3),
+        "broker_calls_per_run": round(calls / runs, 1),
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time dashboard page renders")
+    parser.add_argument("pages", nargs="+", help="page modules, e.g. holdings order_manage")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--click", help="label of a button to press after the first render")
+    parser.add_argument("--warm", action="store_true", help="keep the response cache between runs")
+    args = parser.parse_args()
+    for module in args.pages:
+        print(json.dumps(profile_page(module, args.runs, args.click, args.warm)))
+    print(json.dumps(cassette.stats()))
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,41 @@
+import threading
+from datetime import date
 import streamlit as st
-import pandas as pd
 from utils import integrate_get
+import instruments
+import symbol_search
 
-@st.cache_data
-def load_master():
-    # Supports both 14 and 15 column master.csv automatically
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    if df.shape[1] == 15:
-        df.columns = [
-            "segment", "token", "symbol", "symbol_series", "series", "unknown1",
-            "unknown2", "unknown3", "series2", "unknown4", "unknown5", "unknown6",
-            "isin", "unknown7", "company"
-        ]
-        return df[["segment", "token", "symbol", "symbol_series", "series"]]
-    else:  # legacy 14-column
-        df.columns = [
-            "segment", "token", "symbol", "instrument", "series", "isin1",
-            "facevalue", "lot", "something", "zero1", "two1", "one1", "isin", "one2"
-        ]
-        return df[["segment", "token", "symbol", "instrument", "series"]]
+# Circuit bands are fixed for the trading day: fetched once per instrument and
+# shared by every session until the date changes
+_circuits = {}
+_circuits_day = None
+_circuits_lock = threading.Lock()
 
-def get_token_by_symbol(symbol, exchange, master_df):
-    symbol = symbol.strip().upper()
-    exchange = exchange.strip().upper()
-    # Try symbol first
-    row = master_df[(master_df['symbol'].str.upper() == symbol) & (master_df['segment'].str.upper() == exchange)]
-    if not row.empty:
-        return row.iloc[0]['token']
-    # Try symbol_series (for indices in 15-col)
-    if "symbol_series" in master_df.columns:
-        row2 = master_df[(master_df['symbol_series'].str.upper() == symbol) & (master_df['segment'].str.upper() == exchange)]
-        if not row2.empty:
-            return row2.iloc[0]['token']
-    # Try instrument (for 14-col)
-    if "instrument" in master_df.columns:
-        row3 = master_df[(master_df['instrument'].str.upper() == symbol) & (master_df['segment'].str.upper() == exchange)]
-        if not row3.empty:
-            return row3.iloc[0]['token']
-    return None
+class CircuitLimitsUnavailable(Exception):
+    """No circuit band for the symbol: unknown instrument or no usable quote"""
+
+def get_circuit_limits(symbol, exchange="NSE"):
+    """(lower, upper) circuit limits of symbol for today; raises CircuitLimitsUnavailable"""
+    global _circuits, _circuits_day
+    token = instruments.load().token(symbol, exchange)
+    if not token:
+        raise CircuitLimitsUnavailable(f"{exchange}:{symbol} not found in master")
+    key = (str(exchange).strip().upper(), token)
+    with _circuits_lock:
+        if _circuits_day != date.today():
+            _circuits, _circuits_day = {}, date.today()
+        limits = _circuits.get(key)
+    if limits is None:
+        data = integrate_get(f"/quotes/{key[0]}/{token}")
+        if data.get("status") == "ERROR":
+            raise CircuitLimitsUnavailable(f"{exchange}:{symbol} quote failed: {data.get('message', data)}")
+        try:
+            limits = (float(data["lower_circuit"]), float(data["upper_circuit"]))
+        except (KeyError, TypeError, ValueError):
+            raise CircuitLimitsUnavailable(f"{exchange}:{symbol} quote has no circuit limits")
+        with _circuits_lock:
+            _circuits[key] = limits
+    return limits
 
 def render_quotes(data):
     if not data or "status" not in data:
@@ -99,14 +97,14 @@ def render_security_info(data):
 def show():
     st.header("Get Quotes / Security Info")
 
-    master_df = load_master()
-    exchange = st.selectbox("Exchange", sorted(master_df["segment"].unique()), index=0)
-    # Symbol dropdown, only for selected exchange, sorted
-    df_exch = master_df[master_df["segment"] == exchange]
-    symbol_list = sorted(df_exch["symbol"].dropna().unique().tolist())
-    symbol = st.selectbox("Symbol", symbol_list, index=0)
+    master = instruments.load()
+    exchange = st.selectbox("Exchange", master.segments(), index=0)
+    # Search within the selected exchange
+    row = symbol_search.picker("Symbol", master, key="quotes_symbol", within=master.segment(exchange))
+    if row is None:
+        return
 
-    token = get_token_by_symbol(symbol, exchange, master_df)
+    token = master.record(row)["token"]
     if not token:
         st.warning("Symbol-token mapping not found in master file. Try another symbol.")
         return
@@ -0,0 +1,162 @@
+import threading
+import time
+
+# Client-side token-bucket scheduler for every broker call. Each lane has its
+# own bucket; a lane may only take a token while no higher-priority lane is
+# waiting, so order actions never queue behind quote or history traffic.
+# 429/5xx responses pause the lane and halve its rate (AIMD); successes
+# slowly restore it. Throttles that arrive inside the cool-down of an earlier
+# one are the same burst answered late: they do not back off again.
+
+# lane -> (priority, requests per second, burst); lower priority value goes first
+LANES = {
+    "orders": (0, 10.0, 10),
+    "quotes": (1, 10.0, 20),
+    "default": (2, 5.0, 10),
+    "history": (3, 3.0, 10),
+}
+
+ORDER_PATHS = (
+    "/placeorder", "/modify", "/cancel", "/ocoplaceorder", "/gttplaceorder",
+    "/gttmodify", "/gttcancel", "/positions/convert",
+)
+
+MIN_RATE = 0.2        # requests per second floor while backing off
+BASE_BACKOFF = 1.0    # seconds, doubled per consecutive throttle
+MAX_BACKOFF = 30.0
+RECOVERY_STEP = 0.1   # fraction of the configured rate restored per success
+
+def lane_for_url(url):
+    if "/sds/history/" in url:
+        return "history"
+    if "/quotes/" in url:
+        return "quotes"
+    path = url.split("/dart/v1", 1)[-1]
+    if path.startswith(ORDER_PATHS):
+        return "orders"
+    return "default"
+
+def is_throttled(status_code):
+    return status_code == 429 or status_code >= 500
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class RateLimiter:
+    def __init__(self, lanes):
+        self._cond = threading.Condition()
+        self._priority = {name: cfg[0] for name, cfg in lanes.items()}
+        self._base_rate = {name: float(cfg[1]) for name, cfg in lanes.items()}
+        self._buckets = {name: TokenBucket(cfg[1], cfg[2]) for name, cfg in lanes.items()}
+        self._waiting = {name: 0 for name in lanes}
+        self._paused_until = {name: 0.0 for name in lanes}
+        self._strikes = {name: 0 for name in lanes}
+        self._backoff_until = {name: 0.0 for name in lanes}
+        self._throttled = {name: 0 for name in lanes}
+
+    def _higher_priority_waiting(self, lane):
+        prio = self._priority[lane]
+        return any(n and self._priority[name] < prio for name, n in self._waiting.items())
+
+    def _wait_time(self, lane, now):
+        if self._higher_priority_waiting(lane):
+            return 0.05
+        paused = self._paused_until[lane] - now
+        if paused > 0:
+            return paused
+        return self._buckets[lane].wait_time(now)
+
+    def acquire(self, lane, timeout=None):
+        """Block until `lane` may send one request; False if `timeout` expires first"""
+        lane = lane if lane in self._buckets else "default"
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(lane, now)
+                    if wait <= 0:
+                        self._buckets[lane].tokens -= 1
+                        return True
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[lane] -= 1
+                self._cond.notify_all()
+
+    def report(self, lane, status_code, retry_after=None):
+        """Feed a response status back so throttling adapts the lane rate"""
+        lane = lane if lane in self._buckets else "default"
+        with self._cond:
+            now = time.monotonic()
+            if is_throttled(status_code):
+                self._throttled[lane] += 1
+                if now < self._backoff_until[lane]:
+                    # Already backed off for this burst: only make sure the lane waits it out
+                    self._paused_until[lane] = max(self._paused_until[lane], self._backoff_until[lane])
+                    self._cond.notify_all()
+                    return
+                self._strikes[lane] += 1
+                delay = retry_after if retry_after else BASE_BACKOFF * 2 ** (self._strikes[lane] - 1)
+                until = now + min(delay, MAX_BACKOFF)
+                self._paused_until[lane] = max(self._paused_until[lane], until)
+                # The broker throttles per account, so lower-priority lanes slow down too,
+                # each at most once per cool-down window
+                prio = self._priority[lane]
+                for name, bucket in self._buckets.items():
+                    if self._priority[name] >= prio and now >= self._backoff_until[name]:
+                        bucket.refill(now)
+                        bucket.rate = max(MIN_RATE, bucket.rate / 2)
+                        self._backoff_until[name] = until
+            else:
+                self._strikes[lane] = 0
+                bucket = self._buckets[lane]
+                base = self._base_rate[lane]
+                if bucket.rate < base:
+                    bucket.refill(now)
+                    bucket.rate = min(base, bucket.rate + base * RECOVERY_STEP)
+            self._cond.notify_all()
+
+    def configure_lane(self, lane, rate=None, burst=None):
+        with self._cond:
+            bucket = self._buckets[lane]
+            if rate is not None:
+                self._base_rate[lane] = bucket.rate = float(rate)
+            if burst is not None:
+                bucket.burst = float(burst)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            return [
+                {
+                    "lane": name,
+                    "rate": round(bucket.rate, 2),
+                    "configured_rate": self._base_rate[name],
+                    "waiting": self._waiting[name],
+                    "paused_for": round(max(0.0, self._paused_until[name] - now), 2),
+                    "throttled": self._throttled[name],
+                }
+                for name, bucket in sorted(self._buckets.items(), key=lambda kv: self._priority[kv[0]])
+            ]
+
+limiter = RateLimiter(LANES)
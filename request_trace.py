@@ -0,0 +1,56 @@
+import streamlit as st
+import pandas as pd
+import tracing
+import response_cache
+import candle_cache
+import candle_validation
+from transport import coalescing_stats
+from rate_limiter import limiter
+from circuit_breaker import all_stats as breaker_stats
+
+def show():
+    st.header("Broker Request Trace")
+
+    table = tracing.latency_table()
+    if table:
+        st.subheader("Latency by Endpoint")
+        st.dataframe(pd.DataFrame(table), use_container_width=True)
+    else:
+        st.info("No broker calls recorded yet.")
+
+    with st.expander("Recent Calls"):
+        spans = tracing.recent_spans(200)
+        if spans:
+            df = pd.DataFrame(spans[::-1])
+            df["time"] = pd.to_datetime(df["time"], unit="s")
+            st.dataframe(df, use_container_width=True)
+
+    st.subheader("Rate Limiter Lanes")
+    st.dataframe(pd.DataFrame(limiter.stats()), use_container_width=True)
+
+    breakers = breaker_stats()
+    if breakers:
+        st.subheader("Circuit Breakers")
+        st.dataframe(pd.DataFrame(breakers), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    col1.write("**Response cache**")
+    col1.json(response_cache.stats())
+    col2.write("**Request coalescing**")
+    col2.json(coalescing_stats())
+    col1.write("**Candle cache**")
+    col1.json(candle_cache.stats())
+    col2.write("**Candle validation**")
+    col2.json(candle_validation.stats())
+
+    flagged = candle_validation.flagged()
+    if flagged:
+        with st.expander(f"Flagged Candle Batches ({len(flagged)})"):
+            st.dataframe(pd.DataFrame(flagged[::-1]), use_container_width=True)
+
+    if st.button("Clear Trace"):
+        tracing.clear()
+        st.rerun()
+
+if __name__ == "__main__":
+    show()
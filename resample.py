@@ -0,0 +1,54 @@
+import numpy as np
+
+# Resampling pyramid for stored candles. Each derived timeframe is built from
+# the level below it and kept in candle_store like the broker timeframes:
+#
+#   minute -> 5m -> 15m -> 60m        (intraday, buckets anchored at 09:15)
+#   day -> week -> month
+#
+# "minute" and "day" are fetched from SDS. Daily bars are not rebuilt from
+# minutes: minute history is only kept for short windows and the broker's
+# daily candle is the authoritative one.
+
+SESSION_OPEN = 9 * 60 + 15
+
+# derived timeframe -> (parent timeframe, bucket)
+LEVELS = {
+    "5m": ("minute", 5),
+    "15m": ("5m", 15),
+    "60m": ("15m", 60),
+    "week": ("day", "week"),
+    "month": ("day", "month"),
+}
+
+def bucket_starts(ts, level):
+    """Start (minutes since epoch) of the `level` bucket each timestamp falls in"""
+    bucket = LEVELS[level][1]
+    days = ts // 1440
+    if bucket == "week":
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        return (days - (days + 3) % 7) * 1440
+    if bucket == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) * 1440
+    offset = ts % 1440 - SESSION_OPEN
+    return days * 1440 + SESSION_OPEN + offset // bucket * bucket
+
+def bucket_start(minutes, level):
+    return int(bucket_starts(np.array([minutes], dtype=np.int64), level)[0])
+
+def aggregate(data, level):
+    """Parent bars (sorted by ts) -> `level` bars, each stamped with its first bar's time"""
+    ts = data["ts"]
+    if not len(ts):
+        return {name: values[:0] for name, values in data.items()}
+    buckets = bucket_starts(ts, level)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return {
+        "ts": ts[starts],
+        "open": data["open"][starts],
+        "high": np.maximum.reduceat(data["high"], starts),
+        "low": np.minimum.reduceat(data["low"], starts),
+        "close": data["close"][ends],
+        "volume": np.add.reduceat(data["volume"], starts),
+    }
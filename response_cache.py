@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Short-lived cache for read-only Integrate GET endpoints, keyed per account.
+# Streamlit reruns the whole page on every widget click; without this each
+# click refetches /holdings, /orders, /gttorders ... from the broker.
+# Cached responses are shared, callers must treat them as read-only.
+
+# path prefix -> seconds to keep a successful response ("day" = until midnight)
+ENDPOINT_TTLS = {
+    "/holdings": 5,
+    "/positions": 5,
+    "/orders": 5,
+    "/trades": 5,
+    "/gttorders": 5,
+    "/limits": 30,
+    "/securityinfo/": "day",
+}
+
+# order endpoint prefix -> cached endpoints it makes stale
+INVALIDATES = {
+    "/placeorder": ("/orders", "/trades", "/positions", "/holdings", "/limits"),
+    "/modify": ("/orders", "/trades", "/positions", "/limits"),
+    "/cancel": ("/orders", "/limits"),
+    "/positions/convert": ("/positions", "/holdings", "/limits"),
+    "/ocoplaceorder": ("/gttorders",),
+    "/gttplaceorder": ("/gttorders",),
+    "/gttmodify": ("/gttorders",),
+    "/gttcancel": ("/gttorders",),
+}
+
+MAX_ENTRIES = 10000
+
+# Expired entries are kept this long so pages can still render the last known
+# data while the broker is unreachable (see get_stale)
+STALE_GRACE = 15 * 60
+
+_entries = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stale_hits": 0, "invalidations": 0}
+
+def ttl_for(path):
+    for prefix, ttl in ENDPOINT_TTLS.items():
+        if path.startswith(prefix):
+            return ttl
+    return None
+
+def _expiry(ttl, now):
+    if ttl == "day":
+        midnight = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+        return now + (midnight - datetime.now()).total_seconds()
+    return now + ttl
+
+def _account(headers):
+    headers = headers or {}
+    return headers.get("uid", ""), headers.get("actid", "")
+
+def get(headers, path):
+    if ttl_for(path) is None:
+        return None
+    key = (_account(headers), path)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+    return None
+
+def get_stale(headers, path):
+    """Last cached response for `path` even if expired, or None"""
+    key = (_account(headers), path)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] + STALE_GRACE > time.monotonic():
+            _stats["stale_hits"] += 1
+            return entry[1]
+    return None
+
+def put(headers, path, data):
+    ttl = ttl_for(path)
+    if ttl is None or not isinstance(data, dict) or data.get("status") == "ERROR":
+        return
+    now = time.monotonic()
+    with _lock:
+        if len(_entries) >= MAX_ENTRIES:
+            for key in [k for k, v in _entries.items() if v[0] + STALE_GRACE <= now]:
+                del _entries[key]
+            if len(_entries) >= MAX_ENTRIES:
+                del _entries[next(iter(_entries))]
+        _entries[(_account(headers), path)] = (_expiry(ttl, now), data)
+
+def invalidate_after(headers, path):
+    """Drop cached entries made stale by a successful order action on `path`"""
+    stale = ()
+    for prefix, targets in INVALIDATES.items():
+        if path.startswith(prefix):
+            stale = targets
+            break
+    if not stale:
+        return
+    account = _account(headers)
+    with _lock:
+        for key in [k for k in _entries if k[0] == account and k[1].startswith(stale)]:
+            del _entries[key]
+        _stats["invalidations"] += 1
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+def stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries))
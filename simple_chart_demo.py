@@ -1,50 +1,13 @@
 import streamlit as st
 import pandas as pd
-import requests
-import io
+from history import fetch_candles_definedge
+import instruments
+import symbol_search
+import date_axis
 from datetime import datetime, timedelta
 import plotly.graph_objs as go
 import numpy as np
 
-@st.cache_data
-def load_master():
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    df.columns = [
-        "segment", "token", "symbol", "symbol_series", "series", "unknown1",
-        "unknown2", "unknown3", "series2", "unknown4", "unknown5", "unknown6",
-        "isin", "unknown7", "company"
-    ]
-    return df[["segment", "token", "symbol", "symbol_series", "series", "company"]]
-
-def get_token(symbol, segment, series, master_df):
-    candidates = master_df[
-        (master_df['segment'].str.upper() == segment.upper()) &
-        ((master_df['symbol'].str.upper() == symbol.upper()) | (master_df['symbol_series'].str.upper() == symbol.upper()))
-    ]
-    if not candidates.empty:
-        row = candidates[candidates['series'].str.upper() == series.upper()]
-        if not row.empty:
-            return row.iloc[0]['token']
-        return candidates.iloc[0]['token']
-    return None
-
-def fetch_candles_definedge(segment, token, from_dt, to_dt, api_key):
-    url = f"https://data.definedgesecurities.com/sds/history/{segment}/{token}/day/{from_dt}/{to_dt}"
-    headers = {"Authorization": api_key}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        raise Exception(f"API error: {resp.status_code} {resp.text}")
-    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
-    df = pd.read_csv(io.StringIO(resp.text), header=None, names=cols)
-    df = df[df["Dateandtime"].notnull()]
-    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
-    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
-    df = df.dropna(subset=["Date"])
-    df = df[df["Date"] <= pd.Timestamp.now()]
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
-
 def get_time_range(days, endtime="1530"):
     now = datetime.now()
     to = now.replace(hour=15, minute=30, second=0, microsecond=0)
@@ -54,45 +17,26 @@ def get_time_range(days, endtime="1530"):
     return frm.strftime("%d%m%Y%H%M"), to.strftime("%d%m%Y%H%M")
 
 def compute_relative_strength(stock_df, index_df):
-    # Align by date, drop NaN, and calculate RS = stock_return / index_return
-    merged = pd.merge(
-        stock_df[["Date", "Close"]],
-        index_df[["Date", "Close"]].rename(columns={"Close": "IndexClose"}),
-        on="Date",
-        how="inner"
-    ).dropna()
-    if len(merged) < 10:
+    # Align on the shared date axis and calculate RS = stock close / index close
+    rs_series = date_axis.relative_strength(stock_df, index_df)
+    if len(rs_series) < 10:
         return pd.Series(dtype="float64")
-    # Calculate ratio series (stock / index)
-    rs_series = merged["Close"] / merged["IndexClose"]
-    rs_series.index = merged["Date"]
     return rs_series
 
 def show():
     st.header("Definedge Simple Candlestick Chart Demo (Daily, Live)")
 
     api_key = st.secrets.get("integrate_api_session_key", "")
-    master_df = load_master()
+    master = instruments.load()
 
-    segment_options = sorted(master_df["segment"].str.upper().unique())
+    segment_options = master.segments()
     segment = st.selectbox("Segment", segment_options, index=0)
 
-    df_segment = master_df[master_df["segment"].str.upper() == segment].copy()
-    df_segment["display_name"] = df_segment.apply(
-        lambda r: f"{r['symbol']} ({r['series']})" if pd.notnull(r['series']) else r['symbol'], axis=1
-    )
-    df_segment = df_segment.drop_duplicates(subset=["symbol", "series"])
-    symbol_display_list = df_segment["display_name"].tolist()
-    symbol_idx = 0
-    symbol_display = st.selectbox("Symbol", symbol_display_list, index=symbol_idx)
-
-    selected_row = df_segment[df_segment["display_name"] == symbol_display].iloc[0]
-    symbol = selected_row["symbol"]
-    possible_series = df_segment[df_segment["symbol"] == symbol]["series"].unique()
-    if len(possible_series) == 1:
-        series = possible_series[0]
-    else:
-        series = st.selectbox("Series", possible_series, index=0)
+    row = symbol_search.picker("Symbol", master, key="chart_symbol", within=master.segment(segment))
+    if row is None:
+        return
+    record = master.record(row)
+    symbol, series = record["symbol"], record["series"]
 
     st.write("Selected:", segment, symbol, series)
 
@@ -113,24 +57,20 @@ def show():
     index_row = None
     index_symbol = None
     index_series = "IDX"
-    for idx, row in master_df.iterrows():
-        sym = row["symbol"].strip().lower()
-        if (rs_index_option == "Nifty 500" and sym == "nifty 500") or \
-           (rs_index_option == "Nifty 50" and sym == "nifty 50"):
-            index_row = row
-            index_symbol = row["symbol"]
-            if "series" in row and pd.notnull(row["series"]):
-                index_series = row["series"]
-            break
-
-    token = get_token(symbol, segment, series, master_df)
+    row = master.find(rs_index_option, "NSE")
+    if row is not None:
+        index_row = master.record(row)
+        index_symbol = index_row["symbol"]
+        index_series = index_row["series"] or index_series
+
+    token = record["token"]
     if not token:
         st.error("Symbol-token mapping not found in master file. Try another symbol/series.")
         return
 
     from_dt, to_dt = get_time_range(120)
     try:
-        df = fetch_candles_definedge(segment, token, from_dt, to_dt, api_key)
+        df = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key)
     except Exception as e:
         st.error(f"Error fetching candles: {e}")
         return
@@ -144,7 +84,7 @@ def show():
         index_token = index_row["token"]
         index_segment = index_row["segment"]
         try:
-            index_df = fetch_candles_definedge(index_segment, index_token, from_dt, to_dt, api_key)
+            index_df = fetch_candles_definedge(index_segment, index_token, "day", from_dt, to_dt, api_key)
         except Exception as e:
             st.warning(f"Error fetching {rs_index_option} candles: {e}")
             index_df = None
@@ -152,7 +92,6 @@ def show():
         index_df = None
         st.warning(f"{rs_index_option} not found in master file, RS will not be shown.")
 
-    df = df.sort_values("Date")
     chart_df = df.tail(60).copy()
 
     if show_ema20:
@@ -0,0 +1,140 @@
+"""Binary snapshots of the tab-separated reference files (master.csv, watchlists).
+
+    python snapshot.py                 # compile master.csv, resolve watchlist_*.csv to master ids
+    python snapshot.py master.csv
+
+A snapshot is an .npz holding each text column as its unique strings (one
+UTF-8 blob, newline separated) plus integer codes into them, so loading skips CSV tokenizing and type
+inference and repeated values (segment, series, company) become one shared
+string object. It is reused while the source file's size and mtime match;
+if they differ the source is hashed and only re-parsed when its content
+really changed.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_DIR = os.environ.get("REFERENCE_SNAPSHOT_DIR", ".snapshots")
+FORMAT = 2
+CATEGORICAL = ("segment", "series")   # few distinct values, kept as pandas categoricals
+
+_stats = {"snapshot_loads": 0, "parses": 0, "hash_checks": 0}
+
+def snapshot_path(path):
+    return os.path.join(SNAPSHOT_DIR, os.path.basename(path) + ".npz")
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _source_state(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def write(path, df, source=None):
+    """Compile a DataFrame of string columns into the snapshot for `path`"""
+    source = source or dict(_source_state(path), sha1=file_hash(path))
+    arrays = {}
+    for col in df.columns:
+        values, codes = np.unique(df[col].fillna("").astype(str).to_numpy(), return_inverse=True)
+        arrays[f"{col}.values"] = np.frombuffer("\n".join(values.tolist()).encode("utf-8"), dtype=np.uint8)
+        arrays[f"{col}.codes"] = codes.astype(np.int32 if len(values) > 32767 else np.int16)
+    meta = dict(source, format=FORMAT, columns=list(df.columns), source=os.path.abspath(path))
+    target = snapshot_path(path)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = f"{target}.{threading.get_ident()}.tmp.npz"
+    np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, target)
+    return target
+
+def _read(target):
+    with np.load(target) as f:
+        meta = json.loads(str(f["meta"]))
+        columns = {}
+        for col in meta["columns"]:
+            values = f[f"{col}.values"].tobytes().decode("utf-8").split("\n")
+            codes = f[f"{col}.codes"]
+            if col in CATEGORICAL:
+                columns[col] = pd.Categorical.from_codes(codes, categories=values)
+            else:
+                # One str object per distinct value, shared by every row holding it
+                columns[col] = pd.Series(np.array(values, dtype=object)[codes], dtype=object)
+    return meta, pd.DataFrame(columns)
+
+def load(path, parse, columns=None):
+    """DataFrame for `path` from its snapshot, re-running parse(path) only if the file changed
+
+    columns, if given, also re-parses snapshots written with a different column set.
+    """
+    state = _source_state(path)
+    target = snapshot_path(path)
+    try:
+        meta, df = _read(target)
+    except (OSError, ValueError, KeyError):
+        meta, df = None, None
+    if columns is not None and meta is not None and meta.get("columns") != list(columns):
+        meta = None
+    if meta is not None and meta.get("format") == FORMAT and meta.get("source") == os.path.abspath(path):
+        if meta["size"] == state["size"] and meta["mtime_ns"] == state["mtime_ns"]:
+            _stats["snapshot_loads"] += 1
+            return df
+        # Touched but maybe not edited (checkout, copy): compare content
+        _stats["hash_checks"] += 1
+        digest = file_hash(path)
+        if digest == meta["sha1"]:
+            _stats["snapshot_loads"] += 1
+            _rewrite_meta(target, meta, dict(state, sha1=digest))
+            return df
+    _stats["parses"] += 1
+    df = parse(path)
+    try:
+        write(path, df, dict(state, sha1=file_hash(path)))
+        return _read(target)[1]
+    except OSError:
+        # Read-only deployment: serve the parsed frame without a snapshot
+        return df
+
+def _rewrite_meta(target, meta, source):
+    try:
+        with np.load(target) as f:
+            arrays = {name: f[name] for name in f.files if name != "meta"}
+        meta = dict(meta, **source)
+        tmp = f"{target}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, target)
+    except OSError:
+        pass
+
+def stats():
+    return dict(_stats)
+
+def main():
+    # Imported here: both modules load their files through this one
+    import instruments
+    import watchlists
+    parser = argparse.ArgumentParser(description="Compile reference CSVs into binary snapshots")
+    parser.add_argument("files", nargs="*")
+    args = parser.parse_args()
+    files = args.files or [instruments.MASTER_FILE] + sorted(glob.glob("watchlist_*.csv"))
+    for path in files:
+        started = time.perf_counter()
+        if os.path.basename(path) == os.path.basename(instruments.MASTER_FILE):
+            target = write(path, instruments.parse(path))
+        else:
+            # Watchlists are stored as master row ids, not as text columns
+            watchlists.load(path)
+            target = watchlists.ids_path(path)
+        print(json.dumps({"file": path, "snapshot": target, "bytes": os.path.getsize(target),
+                          "seconds": round(time.perf_counter() - started, 3)}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from bisect import bisect_left
+import streamlit as st
+
+# Search-as-you-type over the instrument master. Pages show a text box and a
+# short list of matches instead of a selectbox holding every row, so the
+# browser receives `limit` options per rerun however large the master gets.
+#
+# The index is built once per Master and kept on it:
+#   - one sorted list of (key, field rank, row) for prefix lookups on symbol,
+#     symbol_series, each company word and ISIN (bisect to the prefix range)
+#   - symbol trigrams -> rows, for typo-tolerant matches when prefixes run dry
+
+DEFAULT_LIMIT = 20
+
+SYMBOL, SYMBOL_SERIES, COMPANY, ISIN = range(4)
+
+def _trigrams(text):
+    text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SymbolIndex:
+    def __init__(self, master):
+        entries = []
+        columns = zip(master.column("symbol").tolist(), master.column("symbol_series").tolist(),
+                      master.column("company").tolist(), master.column("isin").tolist())
+        self._trigrams = {}
+        self._allowed = {}
+        for row, (symbol, symbol_series, company, isin) in enumerate(columns):
+            symbol = str(symbol).strip().upper()
+            entries.append((symbol, SYMBOL, row))
+            series_key = str(symbol_series).strip().upper()
+            if series_key and series_key != symbol:
+                entries.append((series_key, SYMBOL_SERIES, row))
+            for word in str(company).upper().split():
+                entries.append((word, COMPANY, row))
+            if len(isin) == 12:
+                entries.append((isin.upper(), ISIN, row))
+            for gram in _trigrams(symbol):
+                self._trigrams.setdefault(gram, []).append(row)
+        entries.sort()
+        self._entries = entries
+        self._keys = [key for key, _, _ in entries]
+        self._symbols = [str(s).strip().upper() for s in master.column("symbol").tolist()]
+
+    def allowed(self, within):
+        """Set of the rows in `within`, built once per array (master.segment()/tradable() are cached)"""
+        cached = self._allowed.get(id(within))
+        if cached is None or cached[0] is not within:
+            cached = self._allowed[id(within)] = (within, frozenset(within.tolist()))
+        return cached[1]
+
+    def _prefix(self, query):
+        # Best (rank, exactness) per row among all entries starting with the
+        # query; the result limit is applied after scoring, not here, so a
+        # common word ("IND") still intersects with the other words
+        found = {}
+        i = bisect_left(self._keys, query)
+        j = bisect_left(self._keys, query + "\uffff", i)
+        for key, rank, row in self._entries[i:j]:
+            score = (rank, key != query, len(key))
+            if row not in found or score < found[row]:
+                found[row] = score
+        return found
+
+    def _fuzzy(self, query, limit):
+        grams = _trigrams(query)
+        counts = {}
+        for gram in grams:
+            for row in self._trigrams.get(gram, ()):
+                counts[row] = counts.get(row, 0) + 1
+        # Jaccard similarity on symbol trigrams
+        scored = [
+            (-(n / (len(grams) + len(_trigrams(self._symbols[row])) - n)), row)
+            for row, n in counts.items() if n >= max(1, len(grams) // 3)
+        ]
+        scored.sort()
+        return [row for _, row in scored[:limit]]
+
+    def search(self, query, limit=DEFAULT_LIMIT, allowed=None):
+        """Row positions best matching `query`; `allowed` restricts to a set of rows"""
+        query = " ".join(str(query).upper().split())
+        if not query:
+            return []
+        words = query.split()
+        found = self._prefix(query)
+        if len(words) > 1:
+            # "tata mot": rows where every word starts one of the row's keys
+            per_word = [self._prefix(word) for word in words]
+            for row in set(per_word[0]).intersection(*per_word[1:]):
+                scores = [hits[row] for hits in per_word]
+                score = tuple(sum(parts) for parts in zip(*scores))
+                if row not in found or score < found[row]:
+                    found[row] = score
+        rows = [row for row, _ in sorted(found.items(), key=lambda item: (item[1], self._symbols[item[0]]))]
+        if allowed is not None:
+            rows = [row for row in rows if row in allowed]
+        if len(rows) < limit:
+            for row in self._fuzzy(words[0], limit * 2):
+                if row not in found and (allowed is None or row in allowed):
+                    rows.append(row)
+        return rows[:limit]
+
+def index_for(master):
+    index = getattr(master, "_search_index", None)
+    if index is None:
+        index = master._search_index = SymbolIndex(master)
+    return index
+
+def describe(master, row):
+    record = master.record(row)
+    text = f"{record['symbol']} ({record['series']})" if record["series"] else str(record["symbol"])
+    if record["company"]:
+        text += f" – {record['company']}"
+    return f"{text} · {record['segment']}"
+
+def picker(label, master, key, default="", within=None, limit=DEFAULT_LIMIT):
+    """Text search plus a selectbox of the top matches; returns a master row position or None
+
+    within is an optional array of master rows (e.g. master.tradable()).
+    """
+    query = st.text_input(f"Search {label}", value=default, key=f"{key}_query",
+                          placeholder="Symbol, company or ISIN")
+    if not query.strip():
+        st.caption("Type a symbol, company name or ISIN.")
+        return None
+    index = index_for(master)
+    rows = index.search(query, limit, index.allowed(within) if within is not None else None)
+    if not rows:
+        st.caption("No matching instruments.")
+        return None
+    choice = st.selectbox(label, range(len(rows)), format_func=lambda i: describe(master, rows[i]),
+                          key=f"{key}_choice")
+    return rows[choice] if choice is not None and choice < len(rows) else rows[0]
+
+# Queries whose first match must not regress, checked by `python symbol_search.py`
+CHECKS = [
+    ("sbin", "SBIN"),
+    ("hdfc bank", "HDFCBANK"),
+    ("tata mot", "TATAMOTORS"),
+    ("reliance ind", "RELIANCE"),    # "IND" alone prefixes hundreds of keys
+    ("relaince", "RELIANCE"),
+]
+
+def main():
+    import instruments
+    master = instruments.load()
+    index = index_for(master)
+    failed = 0
+    for query, expected in CHECKS:
+        rows = index.search(query)
+        top = master.record(rows[0])["symbol"] if rows else None
+        failed += top != expected
+        print(f"{'ok  ' if top == expected else 'FAIL'} {query!r} -> {top} (expected {expected})")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import requests
-import io
-from datetime import datetime, timedelta
-
-@st.cache_data
-def load_master():
-    df = pd.read_csv("master.csv", sep="\t", header=None)
-    df.columns = [
-        "segment", "token", "symbol", "symbol_series", "series", "unknown1",
-        "unknown2", "unknown3", "series2", "unknown4", "unknown5", "unknown6",
-        "isin", "unknown7", "company"
-    ]
-    return df[["segment", "token", "symbol", "symbol_series", "series", "company"]]
-
-def get_token(symbol, segment, series, master_df):
-    candidates = master_df[
-        (master_df['segment'].str.upper() == segment.upper()) &
-        ((master_df['symbol'].str.upper() == symbol.upper()) | (master_df['symbol_series'].str.upper() == symbol.upper()))
-    ]
-    if not candidates.empty:
-        row = candidates[candidates['series'].str.upper() == series.upper()]
-        if not row.empty:
-            return row.iloc[0]['token']
-        return candidates.iloc[0]['token']
-    return None
-
-def fetch_candles_definedge(segment, token, timeframe, from_dt, to_dt, api_key):
-    url = f"https://data.definedgesecurities.com/sds/history/{segment}/{token}/{timeframe}/{from_dt}/{to_dt}"
-    headers = {"Authorization": api_key}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code != 200:
-        raise Exception(f"API error: {resp.status_code} {resp.text}")
-    cols = ["Dateandtime", "Open", "High", "Low", "Close", "Volume", "OI"]
-    df = pd.read_csv(io.StringIO(resp.text), header=None, names=cols)
-    df = df[df["Dateandtime"].notnull()]
-    df = df[df["Dateandtime"].astype(str).str.strip() != ""]
-    df["Date"] = pd.to_datetime(df["Dateandtime"], format="%d%m%Y%H%M", errors="coerce")
-    df = df.dropna(subset=["Date"])
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+from history import fetch_last_bars
+import instruments
+import symbol_search
+
+DAILY_BARS = 300     # 200 EMA plus warm-up
+RSI_BARS = 15        # RSI14 is a 14-bar rolling mean of changes
+INTRADAY_BARS = 100
 
 def compute_ema(series, period):
     return series.ewm(span=period, adjust=False).mean()
@@ -76,12 +42,6 @@ def count_downdays(df, window=15):
             count += 1
     return count
 
-def get_time_range(days, endtime="1530"):
-    to = datetime.now()
-    to = to.replace(hour=int(endtime[:2]), minute=int(endtime[2:]), second=0, microsecond=0)
-    frm = to - timedelta(days=days)
-    return frm.strftime("%d%m%Y%H%M"), to.strftime("%d%m%Y%H%M")
-
 def display_metric(label, value):
     st.metric(label, "N/A" if pd.isna(value) else f"{value:.2f}")
 
@@ -89,41 +49,31 @@ def show():
     st.header("Symbol Technical Details")
 
     api_key = st.secrets.get("integrate_api_session_key", "")
-    master_df = load_master()
+    master = instruments.load()
 
     # Auto select: Segment, then Symbol, then Series
     col1, col2, col3 = st.columns(3)
     with col1:
-        segment_options = sorted(master_df["segment"].str.upper().unique())
+        segment_options = master.segments()
         segment = st.selectbox("Segment", segment_options, index=0)
     with col2:
-        df_segment = master_df[master_df["segment"].str.upper() == segment]
-        df_segment["display_name"] = df_segment.apply(
-            lambda r: f"{r['symbol']} ({r['series']})" if pd.notnull(r['series']) else r['symbol'], axis=1
-        )
-        df_segment = df_segment.drop_duplicates(subset=["symbol", "series"])
-        symbol_display_list = df_segment["display_name"].tolist()
-        symbol_display = st.selectbox("Symbol", symbol_display_list, index=0)
-        selected_row = df_segment[df_segment["display_name"] == symbol_display].iloc[0]
-        symbol = selected_row["symbol"]
+        row = symbol_search.picker("Symbol", master, key="technical_symbol", within=master.segment(segment))
     with col3:
-        possible_series = df_segment[df_segment["symbol"] == symbol]["series"].unique()
-        if len(possible_series) == 1:
-            series = possible_series[0]
-        else:
-            series = st.selectbox("Series", possible_series, index=0)
         st.caption("EMAs/RSI are for daily timeframe.")
 
-    token = get_token(symbol, segment, series, master_df)
+    if row is None:
+        return
+    record = master.record(row)
+    symbol, series, token = record["symbol"], record["series"], record["token"]
     if not token:
         st.warning("Symbol-token mapping not found in master file. Try exact symbol or instrument code.")
         return
 
     try:
-        from_dt, to_dt = get_time_range(420)
-        daily = fetch_candles_definedge(segment, token, "day", from_dt, to_dt, api_key)
-        week_df = daily.copy().set_index("Date").resample("W").agg({"Open":"first","High":"max","Low":"min","Close":"last","Volume":"sum"}).dropna().reset_index()
-        month_df = daily.copy().set_index("Date").resample("M").agg({"Open":"first","High":"max","Low":"min","Close":"last","Volume":"sum"}).dropna().reset_index()
+        daily = fetch_last_bars(segment, token, "day", DAILY_BARS, api_key)
+        # Weekly/monthly bars are kept pre-aggregated in the candle store
+        week_df = fetch_last_bars(segment, token, "week", RSI_BARS, api_key)
+        month_df = fetch_last_bars(segment, token, "month", RSI_BARS, api_key)
     except Exception as e:
         st.error(f"Error fetching candles: {e}")
         return
@@ -164,6 +114,26 @@ def show():
         st.metric("200 EMA", f"{ema200:.2f}")
         st.metric("20 EMA / LTP", f"{ema20_ltp:.4f}")
 
+    intraday_tf = st.selectbox("Intraday timeframe", ["None", "5m", "15m", "60m"], index=0)
+    if intraday_tf != "None":
+        try:
+            intraday = fetch_last_bars(segment, token, intraday_tf, INTRADAY_BARS, api_key)
+        except Exception as e:
+            st.error(f"Error fetching {intraday_tf} candles: {e}")
+            intraday = pd.DataFrame()
+        if not intraday.empty:
+            intraday["EMA20"] = compute_ema(intraday["Close"], 20)
+            intraday["RSI"] = compute_rsi(intraday["Close"], 14)
+            rsi_intraday = intraday["RSI"].dropna().iloc[-1] if intraday["RSI"].notna().any() else np.nan
+            coli = st.columns(3)
+            with coli[0]:
+                display_metric(f"{intraday_tf} RSI", rsi_intraday)
+            with coli[1]:
+                display_metric(f"{intraday_tf} 20 EMA", intraday["EMA20"].iloc[-1])
+            with coli[2]:
+                st.metric(f"{intraday_tf} bars", len(intraday))
+            st.dataframe(intraday.tail(15)[["Date", "Open", "High", "Low", "Close", "Volume", "EMA20", "RSI"]])
+
     st.markdown("#### Recent Daily Candles")
     st.dataframe(daily.tail(15)[["Date", "Open", "High", "Low", "Close", "EMA20", "EMA50", "EMA200", "RSI"]])
 
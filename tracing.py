@@ -0,0 +1,96 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# Cheap per-call spans for broker traffic, kept in a bounded in-memory ring
+# buffer for the "Request Trace" page. Request/response bodies are only
+# formatted when INTEGRATE_TRACE_BODIES is set and the "integrate" logger
+# is at DEBUG level.
+
+logger = logging.getLogger("integrate")
+
+TRACE_BODIES = os.environ.get("INTEGRATE_TRACE_BODIES", "") not in ("", "0", "false", "False")
+BUFFER_SIZE = int(os.environ.get("INTEGRATE_TRACE_BUFFER", "1000"))
+BODY_LIMIT = 2000
+
+_spans = deque(maxlen=BUFFER_SIZE)
+_spans_lock = threading.Lock()
+
+_ID_SEGMENT = re.compile(r"/(?!v\d+(?:/|$))[^/]*\d[^/]*")
+
+def endpoint_of(url):
+    """URL -> low-cardinality endpoint label, e.g. /dart/v1/quotes/NSE/{id}"""
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+def bodies_enabled():
+    return TRACE_BODIES and logger.isEnabledFor(logging.DEBUG)
+
+def _redact(headers):
+    return {k: ("***" if k.lower() == "authorization" else v) for k, v in (headers or {}).items()}
+
+def log_request(method, url, headers=None, payload=None):
+    if bodies_enabled():
+        logger.debug("%s %s payload=%s headers=%s", method, url, payload, _redact(headers))
+
+def log_response(method, resp):
+    if bodies_enabled():
+        logger.debug("%s response: %s %s", method, resp.status_code, resp.text[:BODY_LIMIT])
+
+def record(method, url, status, started, bytes_in=0, bytes_out=0, retries=0, lane="", error=None):
+    span = {
+        "time": time.time(),
+        "method": method,
+        "endpoint": endpoint_of(url),
+        "status": status,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "retries": retries,
+        "lane": lane,
+        "error": error,
+    }
+    with _spans_lock:
+        _spans.append(span)
+    return span
+
+def recent_spans(limit=None):
+    with _spans_lock:
+        spans = list(_spans)
+    return spans[-limit:] if limit else spans
+
+def clear():
+    with _spans_lock:
+        _spans.clear()
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+def latency_table():
+    """Per-endpoint aggregates over the ring buffer, slowest p95 first"""
+    groups = {}
+    for span in recent_spans():
+        groups.setdefault((span["method"], span["endpoint"]), []).append(span)
+    rows = []
+    for (method, endpoint), spans in groups.items():
+        latencies = sorted(s["latency_ms"] for s in spans)
+        rows.append({
+            "method": method,
+            "endpoint": endpoint,
+            "calls": len(spans),
+            "errors": sum(1 for s in spans if s["error"] or (s["status"] or 0) >= 400),
+            "retries": sum(s["retries"] for s in spans),
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "max_ms": latencies[-1],
+            "bytes_in": sum(s["bytes_in"] for s in spans),
+            "bytes_out": sum(s["bytes_out"] for s in spans),
+        })
+    return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
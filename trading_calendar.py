@@ -0,0 +1,71 @@
+from datetime import date, datetime, time, timedelta
+import numpy as np
+
+# NSE equity trading calendar: weekends plus the exchange holiday list.
+# Update HOLIDAYS from the NSE holiday circular each December; a missing
+# holiday only costs one extra bar, fetch_last_bars tops up a short answer.
+
+HOLIDAYS = [
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29", "2024-04-11",
+    "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17", "2024-07-17", "2024-08-15",
+    "2024-10-02", "2024-11-01", "2024-11-15", "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18",
+    "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+    "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03",
+    "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02",
+    "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+]
+_HOLIDAYS = np.array(HOLIDAYS, dtype="datetime64[D]")
+# Before this, trading_days() only knows about weekends
+KNOWN_FROM = np.datetime64(HOLIDAYS[0][:4] + "-01-01", "D")
+
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+SESSION_MINUTES = 375
+
+# bars one session yields per intraday timeframe
+BARS_PER_SESSION = {"minute": 375, "5m": 75, "15m": 25, "60m": 7}
+
+def is_trading_day(day):
+    return bool(np.is_busday(np.datetime64(day, "D"), holidays=_HOLIDAYS))
+
+def trading_days(start, end):
+    """Trading dates from start to end inclusive, as datetime64[D]"""
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1, dtype="datetime64[D]")
+    return days[np.is_busday(days, holidays=_HOLIDAYS)]
+
+def previous_trading_day(day):
+    return np.busday_offset(np.datetime64(day, "D"), -1, roll="forward", holidays=_HOLIDAYS).astype(date)
+
+def last_session(now=None):
+    """Most recent session that has started (today after 09:15 on a trading day)"""
+    now = now or datetime.now()
+    if is_trading_day(now.date()) and now.time() >= MARKET_OPEN:
+        return now.date()
+    return previous_trading_day(now.date())
+
+def sessions_back(n, end=None):
+    """Date of the n-th trading session counting back from `end` (end itself is the 1st)"""
+    end = np.datetime64(end or last_session(), "D")
+    end = np.busday_offset(end, 0, roll="backward", holidays=_HOLIDAYS)
+    return np.busday_offset(end, -(max(n, 1) - 1), roll="backward", holidays=_HOLIDAYS).astype(date)
+
+def time_range_for_bars(n, timeframe="day", now=None):
+    """(from_dt, to_dt) "ddmmYYYYHHMM" strings spanning the last n bars of `timeframe`"""
+    now = now or datetime.now()
+    end = last_session(now)
+    if timeframe == "week":
+        start = end - timedelta(days=end.weekday(), weeks=n - 1)
+    elif timeframe == "month":
+        months = end.year * 12 + end.month - 1 - (n - 1)
+        start = date(months // 12, months % 12 + 1, 1)
+    elif timeframe in BARS_PER_SESSION:
+        start = sessions_back(-(-n // BARS_PER_SESSION[timeframe]), end)
+    else:
+        start = sessions_back(n, end)
+    to = min(now, datetime.combine(now.date(), MARKET_CLOSE))
+    return datetime.combine(start, time(0, 0)).strftime("%d%m%Y%H%M"), to.strftime("%d%m%Y%H%M")
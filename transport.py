@@ -0,0 +1,159 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import limiter, lane_for_url
+from singleflight import SingleFlight
+from circuit_breaker import breaker_for
+import tracing
+import cassette
+
+# One pooled, keep-alive HTTP session per process, shared by every page and
+# every Streamlit session. Reusing sockets avoids a fresh TCP+TLS handshake
+# to the broker on every call.
+
+# Broker endpoints; point these at mock_broker.py for offline load tests
+INTEGRATE_BASE_URL = os.environ.get("INTEGRATE_BASE_URL", "https://integrate.definedgesecurities.com/dart/v1").rstrip("/")
+SDS_BASE_URL = os.environ.get("SDS_BASE_URL", "https://data.definedgesecurities.com/sds").rstrip("/")
+
+POOL_CONNECTIONS = int(os.environ.get("INTEGRATE_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.environ.get("INTEGRATE_POOL_MAXSIZE", "16"))
+
+# (connect, read) seconds, applied to every call that does not pass its own
+CONNECT_TIMEOUT = float(os.environ.get("INTEGRATE_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("INTEGRATE_READ_TIMEOUT", "15"))
+
+# Idempotent GETs are re-sent on connection errors, timeouts, 429 and 5xx with
+# exponential backoff and full jitter. Order actions (including the GET based
+# /cancel and /gttcancel) are never retried.
+GET_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 4.0
+
+# Per-host socket limits (host -> max keep-alive connections)
+HOST_LIMITS = {
+    "integrate.definedgesecurities.com": int(os.environ.get("INTEGRATE_HOST_MAXSIZE", "16")),
+    "data.definedgesecurities.com": int(os.environ.get("SDS_HOST_MAXSIZE", "32")),
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+# Identical GETs in flight at the same time (same URL and credentials) share
+# one upstream request, e.g. several sessions loading /holdings at the open.
+# Responses are fully read (no streaming), so sharing them is safe.
+_get_flights = SingleFlight()
+
+def _make_adapter(maxsize):
+    # pool_block=True makes the per-host limit a hard cap instead of opening
+    # throwaway connections once the pool is exhausted
+    return HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=maxsize, pool_block=True)
+
+def _build_session():
+    session = requests.Session()
+    session.mount("https://", _make_adapter(POOL_MAXSIZE))
+    session.mount("http://", _make_adapter(POOL_MAXSIZE))
+    for host, maxsize in HOST_LIMITS.items():
+        session.mount(f"https://{host}/", _make_adapter(maxsize))
+    return session
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+def configure(pool_connections=None, pool_maxsize=None, host_limits=None):
+    """Change pool sizes and rebuild the shared session"""
+    global _session, POOL_CONNECTIONS, POOL_MAXSIZE
+    with _session_lock:
+        if pool_connections is not None:
+            POOL_CONNECTIONS = int(pool_connections)
+        if pool_maxsize is not None:
+            POOL_MAXSIZE = int(pool_maxsize)
+        if host_limits:
+            HOST_LIMITS.update(host_limits)
+        old, _session = _session, _build_session()
+    if old is not None:
+        old.close()
+
+def _retry_after(resp):
+    try:
+        return float(resp.headers.get("Retry-After", ""))
+    except (TypeError, ValueError):
+        return None
+
+def _request(method, url, **kwargs):
+    if cassette.is_replaying():
+        return cassette.replay(method, url, kwargs.get("json"))
+    resp = get_session().request(method, url, **kwargs)
+    if cassette.is_recording():
+        cassette.record(method, url, kwargs.get("json"), resp)
+    return resp
+
+def _backoff(attempt):
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def _send(method, url, timeout=None, **kwargs):
+    lane = lane_for_url(url)
+    breaker = breaker_for(url)
+    attempts = GET_RETRIES + 1 if method == "GET" and lane != "orders" else 1
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    started = time.perf_counter()
+    resp = None
+    retries = 0
+    try:
+        for retries in range(attempts):
+            if retries:
+                time.sleep(_backoff(retries - 1))
+            probe = breaker.before_call()
+            try:
+                limiter.acquire(lane)
+                try:
+                    resp = _request(method, url, timeout=timeout, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    breaker.record_failure()
+                    if retries == attempts - 1:
+                        raise
+                    continue
+                except requests.exceptions.RequestException:
+                    # Broken body, bad URL, ...: not retried, but still the probe's outcome
+                    breaker.record_failure()
+                    raise
+                limiter.report(lane, resp.status_code, _retry_after(resp))
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            finally:
+                if probe:
+                    # Anything else raised between admission and a recorded outcome
+                    breaker.release()
+            if resp.status_code not in RETRY_STATUSES:
+                break
+    except Exception as e:
+        tracing.record(method, url, None, started, retries=retries, lane=lane, error=str(e))
+        raise
+    body = resp.request.body
+    tracing.record(
+        method, url, resp.status_code, started,
+        bytes_in=len(resp.content or b""), bytes_out=len(body) if body else 0,
+        retries=retries, lane=lane,
+    )
+    return resp
+
+def http_get(url, headers=None, timeout=None):
+    key = (url, tuple(sorted((headers or {}).items())))
+    return _get_flights.do(key, lambda: _send("GET", url, headers=headers, timeout=timeout))
+
+def coalescing_stats():
+    return _get_flights.stats()
+
+def http_post(url, json=None, headers=None, timeout=None):
+    return _send("POST", url, json=json, headers=headers, timeout=timeout)
@@ -1,7 +1,8 @@
 import streamlit as st
-import requests
+from transport import http_get, http_post, INTEGRATE_BASE_URL
 import os
-from debug_utils import debug_log
+import response_cache
+import tracing
 
 def get_session_headers():
     session = st.session_state.get("integrate_session")
@@ -13,52 +14,51 @@ def get_session_headers():
         "uid": session["uid"]
     }
 
+def handle_integrate_response(resp, method):
+    tracing.log_response(method, resp)
+    resp.raise_for_status()
+    try:
+        data = resp.json()
+        if data.get("status") == "ERROR" and "session" in data.get("message", "").lower():
+            tracing.logger.info("Session expired error detected in API response.")
+            st.session_state.pop("integrate_session", None)
+            try:
+                os.remove("session.json")
+            except Exception:
+                pass
+        return data
+    except Exception:
+        return {"status": "ERROR", "message": f"Non-JSON response: {resp.text}"}
+
 def integrate_get(path):
-    base_url = "https://integrate.definedgesecurities.com/dart/v1"
     headers = get_session_headers()
-    url = base_url + path
-    debug_log(f"GET {url} with headers {headers}")
+    cached = response_cache.get(headers, path)
+    if cached is not None:
+        return cached
+    url = INTEGRATE_BASE_URL + path
+    tracing.log_request("GET", url, headers)
     try:
-        resp = requests.get(url, headers=headers, timeout=15)
-        debug_log(f"GET response: {resp.status_code} - {resp.text}")
-        resp.raise_for_status()
-        try:
-            data = resp.json()
-            if data.get("status") == "ERROR" and "session" in data.get("message", "").lower():
-                debug_log("Session expired error detected in API response.")
-                st.session_state.pop("integrate_session", None)
-                try:
-                    os.remove("session.json")
-                except Exception:
-                    pass
-            return data
-        except Exception:
-            return {"status": "ERROR", "message": f"Non-JSON response: {resp.text}"}
+        resp = http_get(url, headers=headers, timeout=15)
+        data = handle_integrate_response(resp, "GET")
+        response_cache.put(headers, path, data)
+        return data
     except Exception as e:
-        debug_log(f"GET error: {e}")
+        tracing.logger.debug("GET %s error: %s", path, e)
+        stale = response_cache.get_stale(headers, path)
+        if stale is not None:
+            return stale
         return {"status": "ERROR", "message": str(e)}
 
 def integrate_post(path, payload):
-    base_url = "https://integrate.definedgesecurities.com/dart/v1"
     headers = get_session_headers()
-    url = base_url + path
-    debug_log(f"POST {url} payload {payload} headers {headers}")
+    url = INTEGRATE_BASE_URL + path
+    tracing.log_request("POST", url, headers, payload)
     try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=15)
-        debug_log(f"POST response: {resp.status_code} - {resp.text}")
-        resp.raise_for_status()
-        try:
-            data = resp.json()
-            if data.get("status") == "ERROR" and "session" in data.get("message", "").lower():
-                debug_log("Session expired error detected in API response.")
-                st.session_state.pop("integrate_session", None)
-                try:
-                    os.remove("session.json")
-                except Exception:
-                    pass
-            return data
-        except Exception:
-            return {"status": "ERROR", "message": f"Non-JSON response: {resp.text}"}
+        resp = http_post(url, json=payload, headers=headers, timeout=15)
+        data = handle_integrate_response(resp, "POST")
+        if data.get("status") != "ERROR":
+            response_cache.invalidate_after(headers, path)
+        return data
     except Exception as e:
-        debug_log(f"POST error: {e}")
+        tracing.logger.debug("POST %s error: %s", path, e)
         return {"status": "ERROR", "message": str(e)}
@@ -0,0 +1,122 @@
+"""Watchlists as arrays of row positions into the shared instrument master.
+
+A watchlist file is resolved against instruments.load() once and kept as a
+read-only int32 array of master rows, in memory and in the snapshot
+directory (<file>.ids.npz), so switching lists or combining them is array
+work instead of CSV parsing:
+
+    ids = watchlists.load("watchlist_1.csv")
+    both = watchlists.intersection(ids, watchlists.load("watchlist_3.csv"))
+    df = watchlists.frame(both)
+
+Lists keep file order and union keeps the order of first appearance. Stored
+ids are reused while the watchlist and master.csv keep their size and mtime.
+"""
+import os
+import threading
+import numpy as np
+import instruments
+import snapshot
+from master_loader import parse_watchlist
+
+IDS_FORMAT = 1
+
+_cache = {}     # path -> (state, ids, unresolved)
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "stored_loads": 0, "resolves": 0}
+
+def ids_path(path):
+    return os.path.join(snapshot.SNAPSHOT_DIR, os.path.basename(path) + ".ids.npz")
+
+def _state(path, master_path):
+    source, master = os.stat(path), os.stat(master_path)
+    return [source.st_size, source.st_mtime_ns, master.st_size, master.st_mtime_ns]
+
+def resolve(path, master):
+    """(row positions in master of the instruments listed in path, count not found)"""
+    if os.path.abspath(path) == os.path.abspath(instruments.MASTER_FILE):
+        return np.arange(len(master), dtype=np.int32), 0
+    df = parse_watchlist(path)
+    by_token = master.by_token
+    rows, seen, unresolved = [], set(), 0
+    for segment, token in zip(df["segment"].tolist(), df["token"].tolist()):
+        row = by_token.get((str(segment).strip().upper(), str(token).strip().upper()))
+        if row is None:
+            unresolved += 1
+        elif row not in seen:
+            seen.add(row)
+            rows.append(row)
+    return np.array(rows, dtype=np.int32), unresolved
+
+def _read(path, state):
+    try:
+        with np.load(ids_path(path)) as f:
+            meta = f["meta"].tolist()
+            if meta[:2] != [IDS_FORMAT, len(state)] or meta[2:2 + len(state)] != state:
+                return None
+            return f["ids"], meta[-1]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write(path, state, ids, unresolved):
+    target = ids_path(path)
+    try:
+        os.makedirs(snapshot.SNAPSHOT_DIR, exist_ok=True)
+        tmp = f"{target}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, ids=ids, meta=np.array([IDS_FORMAT, len(state)] + state + [unresolved], dtype=np.int64))
+        os.replace(tmp, target)
+    except OSError:
+        pass
+
+def load(path, master_path=instruments.MASTER_FILE):
+    """Read-only int32 array of master rows for a watchlist file"""
+    state = _state(path, master_path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == state:
+            _stats["memory_hits"] += 1
+            return cached[1]
+        stored = _read(path, state)
+        if stored is not None:
+            _stats["stored_loads"] += 1
+            ids, unresolved = stored
+        else:
+            _stats["resolves"] += 1
+            ids, unresolved = resolve(path, instruments.load(master_path))
+            _write(path, state, ids, unresolved)
+        ids.flags.writeable = False
+        _cache[path] = (state, ids, unresolved)
+        return ids
+
+def unresolved(path):
+    """Lines of the last loaded `path` whose token is not in the master"""
+    cached = _cache.get(path)
+    return cached[2] if cached is not None else 0
+
+def union(*lists):
+    """Ids in any of the lists, in order of first appearance"""
+    if not lists:
+        return np.empty(0, dtype=np.int32)
+    ids = np.concatenate(lists)
+    _, first = np.unique(ids, return_index=True)
+    return ids[np.sort(first)]
+
+def intersection(ids, *others):
+    """Ids of the first list that are in every other list, in its order"""
+    keep = np.ones(len(ids), dtype=bool)
+    for other in others:
+        keep &= np.isin(ids, other)
+    return ids[keep]
+
+def difference(ids, *others):
+    """Ids of the first list that are in none of the others, in its order"""
+    return ids[~np.isin(ids, union(*others))] if others else ids
+
+def frame(ids, master=None):
+    """Master rows for ids as a fresh 0..n-1 indexed frame (segment, token, symbol, series, company, ...)"""
+    if master is None:
+        master = instruments.load()
+    return master.frame.take(ids).reset_index(drop=True)
+
+def stats():
+    return dict(_stats)